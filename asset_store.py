@@ -0,0 +1,134 @@
+import os
+import re
+import shutil
+import hashlib
+from file_utils import temp_path, link_or_copy
+
+# The template dirs copied next to every report
+ASSET_DIRS = ["css", "js"]
+ASSET_MODES = ["copy", "hardlink", "symlink", "inline"]
+
+CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+CSS_SPACE = re.compile(r"\s+")
+CSS_PUNCTUATION_SPACE = re.compile(r"\s*([{};,>])\s*")
+
+
+def file_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def minify_css(text):
+    text = CSS_COMMENT.sub("", text)
+    text = CSS_SPACE.sub(" ", text)
+    return CSS_PUNCTUATION_SPACE.sub(r"\1", text).strip()
+
+
+def iter_asset_files(tpl_path, asset_dirs):
+    """(source path, path relative to the report dir) of every asset file"""
+    for asset_dir in asset_dirs:
+        src_dir = os.path.join(tpl_path, asset_dir)
+        for dir_path, _, file_names in os.walk(src_dir):
+            for file_name in sorted(file_names):
+                src = os.path.join(dir_path, file_name)
+                yield src, os.path.relpath(src, tpl_path)
+
+
+class AssetStore(object):
+    """
+    Puts the css/js assets of the template into the report dirs. An asset file is only
+    written when the report copy is missing or differs, and always through a temp file
+    renamed over the old one, so a half-written report dir is fixed on the next run.
+    With a store dir the assets are kept once, named after their SHA-1, and hard linked
+    or symlinked into every report. The inline mode copies the js only, the css is
+    minified into the report page
+    """
+    def __init__(self, _store_dir=None, _mode="copy"):
+        if _mode not in ASSET_MODES:
+            raise ValueError("Unknown asset mode '%s', use one of %s" % (_mode, ", ".join(ASSET_MODES)))
+        if _mode in ("hardlink", "symlink") and _store_dir is None:
+            raise ValueError("The %s asset mode needs an asset store dir" % _mode)
+        self.store_dir = None if _store_dir is None else os.path.abspath(_store_dir)
+        self.mode = _mode
+        if self.store_dir is not None and not os.path.exists(self.store_dir):
+            os.makedirs(self.store_dir)
+        # The digests of the template files by (path, size, mtime), not read again for every report
+        self.digests = dict()
+        self.css = dict()
+
+    def digest(self, path):
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime)
+        digest = self.digests.get(key)
+        if digest is None:
+            digest = self.digests[key] = file_digest(path)
+        return digest
+
+    def store_file(self, src, digest):
+        stored = os.path.join(self.store_dir, digest + os.path.splitext(src)[1])
+        if not os.path.exists(stored):
+            tmp_file = temp_path(stored)
+            shutil.copyfile(src, tmp_file)
+            os.replace(tmp_file, stored)
+        return stored
+
+    def up_to_date(self, dst, digest, stored):
+        if not os.path.lexists(dst):
+            return False
+        if self.mode == "symlink":
+            return os.path.islink(dst) and os.readlink(dst) == stored
+        if os.path.islink(dst):
+            return False
+        if stored is not None and os.path.samefile(dst, stored):
+            return True
+        return self.digest(dst) == digest
+
+    def install(self, src, dst):
+        """Put one asset file to dst, returns False when it was already there"""
+        digest = self.digest(src)
+        stored = None
+        if self.store_dir is not None:
+            stored = self.store_file(src, digest)
+        if self.up_to_date(dst, digest, stored):
+            return False
+        dst_dir = os.path.dirname(dst)
+        if not os.path.exists(dst_dir):
+            os.makedirs(dst_dir)
+        tmp_file = temp_path(dst)
+        if self.mode == "symlink":
+            os.symlink(stored, tmp_file)
+        elif self.mode == "hardlink":
+            link_or_copy(stored, tmp_file)
+        else:
+            shutil.copyfile(stored or src, tmp_file)
+        os.replace(tmp_file, dst)
+        return True
+
+    def asset_dirs(self):
+        if self.mode == "inline":
+            return [asset_dir for asset_dir in ASSET_DIRS if asset_dir != "css"]
+        return ASSET_DIRS
+
+    # Put the assets of a template dir into a report dir, returns the number of files written
+    def sync(self, tpl_path, report_path):
+        written = 0
+        for src, rel_path in iter_asset_files(tpl_path, self.asset_dirs()):
+            if self.install(src, os.path.join(report_path, rel_path)):
+                written += 1
+        return written
+
+    # The minified css of the template for the inline mode, None in the other modes
+    def inline_css(self, tpl_path):
+        if self.mode != "inline":
+            return None
+        if tpl_path not in self.css:
+            css = list()
+            for src, _ in iter_asset_files(tpl_path, ["css"]):
+                if src.endswith(".css"):
+                    with open(src, encoding="utf-8") as f:
+                        css.append(minify_css(f.read()))
+            self.css[tpl_path] = "\n".join(css)
+        return self.css[tpl_path]
@@ -0,0 +1,31 @@
+import json
+import argparse
+from report_gen import ReportSpec, generate_reports, add_generate_arguments, \
+    check_generate_arguments, make_generate_options
+from stage_timer import configure_logging
+
+
+def load_report_specs(batch_file):
+    with open(batch_file) as batch_f:
+        batch_js = json.load(batch_f)
+    return [ReportSpec(spec["result_file"], spec["report_dir"], spec["report_name"], spec["module_name"]) \
+        for spec in batch_js]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        usage="python batch_report_gen.py {batch_json_path} {it_template_dir} [options]",
+        description="Render one report per result file in a single process, the report "
+            "template is compiled once for the whole batch",
+        epilog="Example: python batch_report_gen.py ./batch.json ./it_template --stream, with batch.json like "
+            "[{\"result_file\": \"./result.json\", \"report_dir\": \"./report\", "
+            "\"report_name\": \"Planning BVT\", \"module_name\": \"planning\"}]")
+    parser.add_argument("batch_js_path")
+    parser.add_argument("it_tpl_dir")
+    add_generate_arguments(parser)
+    args = parser.parse_args()
+    check_generate_arguments(parser, args)
+    configure_logging(args.log_level)
+
+    report_specs = load_report_specs(args.batch_js_path)
+    generate_reports(report_specs, args.it_tpl_dir, args.stream, **make_generate_options(args))
@@ -0,0 +1,244 @@
+import os
+import sys
+import gc
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import platform
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+import numpy
+import jinja2
+import matplotlib
+import json_backend
+from pose_pic_gen import Keys, Consts, OutMessageParser, TrackParser, RoadPrinter
+from report_gen import JsonConvertor, ReportGen
+
+tpl_dir = os.path.join(root_dir, "it_template")
+
+
+def make_waypoints(rand, count, noise):
+    waypoints = list()
+    x, y, theta = 0.0, 0.0, math.pi
+    # A parking manoeuvre: forward, backward into the lot, forward to straighten
+    switches = (count // 3, 2 * count // 3)
+    for i in range(count):
+        direction = "kBackward" if switches[0] <= i < switches[1] else "kForward"
+        theta += rand.uniform(-0.03, 0.03)
+        step = 0.3 if direction == "kForward" else -0.3
+        x += step * math.cos(theta) + rand.uniform(-noise, noise)
+        y += step * math.sin(theta) + rand.uniform(-noise, noise)
+        waypoints.append({Keys.k_pose: {Keys.k_x: round(x, 8), Keys.k_y: round(y, 8), Keys.k_theta: round(theta, 8)}, \
+            Keys.k_direction: direction, Keys.k_speed: 0.3})
+    return waypoints
+
+
+# The TrajectoryFully output message: the actual message on one line and the expect ones pretty printed
+def make_output_message(actual_waypoints, expect_waypoints_list):
+    actual_msg = {"trajectory_type": "kTrajectory", Keys.k_waypoints: actual_waypoints}
+    expect_msgs = [{"trajectory_type": "kTrajectory", Keys.k_waypoints: waypoints} for waypoints in expect_waypoints_list]
+    expect_msg = expect_msgs[0] if len(expect_msgs) == 1 else expect_msgs
+    return "<b>Track 0:</b> <br/><br/>Current dtw value: 1.0<br/><br/><br/>Actual Message: <br/>%s<br/><br/><br/>" \
+        "Expect Message: <br/>%s<br/><br/>" % (json.dumps(actual_msg, separators=(",", ":")), \
+        json.dumps(expect_msg, indent=4, sort_keys=True).replace("    ", "\t"))
+
+
+def make_channel(channel_id, topic_name, passed, expected_messages, output_messages):
+    return OrderedDict([("channel_id", str(channel_id)), (Keys.k_topic_name, topic_name), ("text_pass", passed), \
+        ("data_pass", True), ("failed_text_indices", [] if passed else [0]), ("failed_data_indices", []), \
+        ("image_similaritiy", []), ("expected_messages", expected_messages), \
+        (Keys.k_out_messages, output_messages), (Keys.k_saved_images, [])])
+
+
+def make_test_case(rand, case_id, passed, waypoints, expect_tracks):
+    descriptions = OrderedDict([("Call Coverage", ""), ("Calls", ""), ("Control Flow Document", ""), \
+        ("Control Flow Verification", "Pass"), ("Data Flow Document", ""), ("Data Flow Verification", "Pass"), \
+        (Keys.k_description, "Synthetic parking case %s" % case_id), ("Design Document", ""), \
+        ("JIRA ID", "BENCH-%s" % case_id), ("Pass Criteria", "Output messages are as expected."), \
+        (Keys.k_case_id, str(case_id)), ("Test Method", "Synthetic benchmark case")])
+    status = '{"status":"kPlanSuccessed"}'
+    channels = [make_channel(30015, "PlanningStatus", True, [status], [status])]
+    expect_waypoints_list = [make_waypoints(rand, waypoints, 0.0) for _ in range(expect_tracks)]
+    actual_waypoints = make_waypoints(rand, waypoints, 0.05)
+    trajectory = make_channel(30013, Consts.TRAJECTORY_TOPIC_NAME, passed, \
+        ["<b>Track 0:</b> <br/><br/>Expected Turn count: 2<br/><br/>"], \
+        [make_output_message(actual_waypoints, expect_waypoints_list)])
+    if not passed:
+        trajectory[Keys.k_failed_reason] = [["TurnCountDiffFailure"] for _ in range(expect_tracks)]
+        trajectory[Keys.k_car_loc] = {Keys.k_x: 0, Keys.k_y: 0, Keys.k_theta: math.pi}
+        trajectory[Keys.k_parking_space] = {
+            Keys.k_p0: {Keys.k_x: 7.0, Keys.k_y: 3.0}, Keys.k_p1: {Keys.k_x: 7.0, Keys.k_y: 5.4},
+            Keys.k_p2: {Keys.k_x: 1.0, Keys.k_y: 5.4}, Keys.k_p3: {Keys.k_x: 1.0, Keys.k_y: 3.0}}
+    channels.append(trajectory)
+    return OrderedDict([(Keys.k_case_pass, passed), ("text_pass", passed), ("data_pass", True), \
+        (Keys.k_descriptions, descriptions), (Keys.k_channels, channels)])
+
+
+def make_result(cases, failure_ratio, waypoints, expect_tracks, seed=0):
+    """A result.json like dict with a planning trajectory in every case, failed_cases of them failed"""
+    rand = random.Random(seed)
+    failed_cases = int(round(cases * failure_ratio))
+    # Spread the failed cases over the run instead of putting them first
+    failed_indices = set(rand.sample(range(cases), failed_cases))
+    test_cases = [make_test_case(rand, i, i not in failed_indices, waypoints, expect_tracks) for i in range(cases)]
+    passed_cases = cases - failed_cases
+    return OrderedDict([("all_pass", failed_cases == 0), ("passed_cases", passed_cases), \
+        ("failed_cases", failed_cases), ("pass_rate", 100.0 * passed_cases / cases if cases else 0.0), \
+        (Keys.k_test_cases, test_cases)])
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    if sys.platform == "darwin":
+        peak /= 1024.0
+    return round(peak / 1024.0, 1)
+
+
+class BestOfTimer(object):
+    """Best of repeat timings of the benchmark stages, with the process peak RSS after each one"""
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.stages = OrderedDict()
+
+    def run(self, name, func, items, unit, setup=None):
+        best = None
+        result = None
+        for _ in range(self.repeat):
+            arg = setup() if setup is not None else None
+            gc.collect()
+            begin = time.time()
+            result = func(arg) if setup is not None else func()
+            elapsed = time.time() - begin
+            if best is None or elapsed < best:
+                best = elapsed
+        self.stages[name] = OrderedDict([("seconds", round(best, 6)), ("items", items), ("unit", unit), \
+            ("throughput", round(items / best, 3) if best > 0 else None), ("peak_rss_mb", peak_rss_mb())])
+        print("%-18s %10.4f s %14.1f %s/s  peak RSS %s MB" % (name, best, \
+            self.stages[name]["throughput"] or 0.0, unit, self.stages[name]["peak_rss_mb"]))
+        return result
+
+
+def failed_trajectory_messages(test_cases):
+    messages = list()
+    for test_case in test_cases:
+        if test_case[Keys.k_case_pass]:
+            continue
+        for channel in test_case[Keys.k_channels]:
+            if channel[Keys.k_topic_name] == Consts.TRAJECTORY_TOPIC_NAME:
+                messages.append(channel[Keys.k_out_messages][0])
+    return messages
+
+
+def run_benchmarks(args, work_dir):
+    config = OrderedDict([("cases", args.cases), ("failure_ratio", args.failure_ratio), \
+        ("waypoints", args.waypoints), ("expect_tracks", args.expect_tracks), ("plot_cases", args.plot_cases), \
+        ("repeat", args.repeat), ("seed", args.seed)])
+    result_file = os.path.join(work_dir, "result.json")
+    with open(result_file, "w") as res_f:
+        json.dump(make_result(args.cases, args.failure_ratio, args.waypoints, args.expect_tracks, args.seed), res_f)
+    result_mb = os.path.getsize(result_file) / (1024.0 * 1024.0)
+
+    timer = BestOfTimer(args.repeat)
+
+    # The decoder of ReportGen.load_result, not the standard library one
+    def load_result():
+        return json_backend.load(result_file)
+    timer.run("json_load", load_result, result_mb, "MB")
+    timer.run("json_convert", lambda old_json: JsonConvertor().add_show_descriptions(old_json), \
+        args.cases, "cases", setup=load_result)
+
+    test_cases = load_result()[Keys.k_test_cases]
+    failed_cases = [test_case for test_case in test_cases if not test_case[Keys.k_case_pass]]
+    messages = failed_trajectory_messages(test_cases)
+    timer.run("out_message_parse", lambda: [OutMessageParser(message).parse() for message in messages], \
+        len(messages), "messages")
+    track_waypoints = len(failed_cases) * (args.expect_tracks + 1) * args.waypoints
+    results = timer.run("track_parse", lambda: [TrackParser(test_case).parse_test_case() for test_case in failed_cases], \
+        track_waypoints, "waypoints")
+
+    image_path = os.path.join(work_dir, "images")
+    os.makedirs(image_path)
+    plot_results = [t_res for t_res in results if t_res.result is True][:args.plot_cases]
+    timer.run("plot_pictures", lambda: [RoadPrinter(t_res.case_info, t_res.trajectory, image_path).plot_pictures() \
+        for t_res in plot_results], len(plot_results) * args.expect_tracks, "images")
+
+    report_path = os.path.join(work_dir, "report")
+    rg = ReportGen(result_file, tpl_dir, report_path, "Benchmark", "none")
+    rg.prepare_dirs()
+    json_result = rg.load_result()
+    # Warm the template cache so the stage measures rendering, not compiling
+    rg.get_template()
+    timer.run("render_report", lambda: rg.render_report(json_result), args.cases, "cases")
+    report_mb = os.path.getsize(os.path.join(report_path, "index.htm")) / (1024.0 * 1024.0)
+
+    environment = OrderedDict([("python", platform.python_version()), ("platform", platform.platform()), \
+        ("numpy", numpy.__version__), ("matplotlib", matplotlib.__version__), ("jinja2", jinja2.__version__), \
+        ("json_backend", json_backend.backend.name)])
+    return OrderedDict([("config", config), ("environment", environment), ("result_mb", round(result_mb, 3)), \
+        ("report_mb", round(report_mb, 3)), ("peak_rss_mb", peak_rss_mb()), ("stages", timer.stages)])
+
+
+# The stages slower than the baseline by more than the tolerance, as (name, baseline, current) seconds
+def find_regressions(baseline, current, tolerance):
+    regressions = list()
+    for name, stage in current["stages"].items():
+        base_stage = baseline.get("stages", {}).get(name)
+        if base_stage is None:
+            continue
+        if stage["seconds"] > base_stage["seconds"] * (1.0 + tolerance):
+            regressions.append((name, base_stage["seconds"], stage["seconds"]))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Time the report stages on a synthetic result.json: JSON load and conversion, "
+            "output message and track parsing, plotting and rendering",
+        epilog="Example: python benchmarks/report_bench.py --cases 2000 --waypoints 200 --output bench.json")
+    parser.add_argument("--cases", type=int, default=500)
+    parser.add_argument("--failure-ratio", type=float, default=0.2)
+    parser.add_argument("--waypoints", type=int, default=100, help="waypoints per track")
+    parser.add_argument("--expect-tracks", type=int, default=1, help="expect tracks per failed case")
+    parser.add_argument("--plot-cases", type=int, default=10, help="failed cases to plot, plotting is the slowest stage")
+    parser.add_argument("--repeat", type=int, default=3, help="keep the best of this many runs of every stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", metavar="DIR", help="keep the generated result file and report in this dir")
+    parser.add_argument("--output", metavar="JSON", help="save the results to this file")
+    parser.add_argument("--baseline", metavar="JSON", help="compare to the results saved by an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+        help="fail when a stage is slower than the baseline by more than this fraction")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="report_bench_")
+    if not os.path.exists(work_dir):
+        os.makedirs(work_dir)
+    try:
+        results = run_benchmarks(args, work_dir)
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    if args.output:
+        with open(args.output, "w") as out_f:
+            json.dump(results, out_f, indent=4)
+    if args.baseline:
+        with open(args.baseline) as base_f:
+            regressions = find_regressions(json.load(base_f), results, args.tolerance)
+        for name, base_seconds, seconds in regressions:
+            print("REGRESSION %s: %.4f s -> %.4f s" % (name, base_seconds, seconds))
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from collections import OrderedDict
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from report_bench import make_result, find_regressions
+
+# The packages a report of a module that plots nothing should never import
+HEAVY_PACKAGES = ["numpy", "matplotlib", "PIL"]
+IMPORT_MODULES = ["report_gen", "batch_report_gen", "pose_pic_gen"]
+
+
+def parse_importtime(stderr):
+    """The cumulative microseconds of every module in the -X importtime output"""
+    times = OrderedDict()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+def import_time(module, repeat):
+    """Best import seconds of a module in a fresh interpreter, and the heavy packages it loads"""
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import %s" % module], cwd=root_dir, \
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+        times = parse_importtime(proc.stderr)
+        seconds = times[module] / 1e6
+        best = seconds if best is None else min(best, seconds)
+    heavy = [package for package in HEAVY_PACKAGES if package in times]
+    return best, heavy
+
+
+def run_seconds(cmd, repeat):
+    best = None
+    for _ in range(repeat):
+        begin = time.time()
+        subprocess.run(cmd, cwd=root_dir, stdout=subprocess.DEVNULL, check=True)
+        seconds = time.time() - begin
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def run_benchmarks(args, work_dir):
+    results = {"python": sys.version.split()[0], "stages": OrderedDict(), "heavy_imports": OrderedDict()}
+    for module in IMPORT_MODULES:
+        seconds, heavy = import_time(module, args.repeat)
+        results["stages"]["import_" + module] = {"seconds": round(seconds, 4)}
+        results["heavy_imports"][module] = heavy
+        print("import %-18s %8.4f s  loads %s" % (module, seconds, ", ".join(heavy) or "no plotting package"))
+
+    # A whole CLI run, the perception report plots nothing and should not pay for matplotlib
+    result_file = os.path.join(work_dir, "result.json")
+    with open(result_file, "w") as res_f:
+        json.dump(make_result(args.cases, args.failure_ratio, 20, 1, seed=args.seed), res_f)
+    for module_name in ["perception", "planning"]:
+        report_dir = os.path.join(work_dir, module_name)
+        cmd = [sys.executable, "report_gen.py", result_file, os.path.join(root_dir, "it_template"), report_dir, \
+            "Bench", module_name, "--log-level", "WARNING"]
+        seconds = run_seconds(cmd, args.repeat)
+        results["stages"]["cli_" + module_name] = {"seconds": round(seconds, 4)}
+        print("cli %-21s %8.4f s" % (module_name, seconds))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Time the startup of the report entry points with python -X importtime, "
+            "and a whole report_gen.py run of a module that plots nothing and of planning",
+        epilog="Example: python benchmarks/startup_bench.py --repeat 5 --output startup.json")
+    parser.add_argument("--cases", type=int, default=50, help="test cases of the synthetic result file")
+    parser.add_argument("--failure-ratio", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=3, help="keep the best of this many runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", metavar="JSON", help="save the results to this file")
+    parser.add_argument("--baseline", metavar="JSON", help="compare to the results saved by an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+        help="fail when a stage is slower than the baseline by more than this fraction")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="startup_bench_")
+    try:
+        results = run_benchmarks(args, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    if args.output:
+        with open(args.output, "w") as out_f:
+            json.dump(results, out_f, indent=4)
+    if args.baseline:
+        with open(args.baseline) as base_f:
+            regressions = find_regressions(json.load(base_f), results, args.tolerance)
+        for name, base_seconds, seconds in regressions:
+            print("REGRESSION %s: %.4f s -> %.4f s" % (name, base_seconds, seconds))
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,75 @@
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from pose_pic_gen import Pose, Track, Keys
+
+
+def make_waypoints(count, seed=0):
+    rand = random.Random(seed)
+    waypoints = list()
+    x, y, theta = 0.0, 0.0, 0.0
+    for i in range(count):
+        theta += rand.uniform(-0.05, 0.05)
+        x += 0.3 * rand.uniform(0.9, 1.1)
+        y += 0.3 * rand.uniform(-0.1, 0.1)
+        direction = "kForward" if (i // 1000) % 2 == 0 else "kBackward"
+        waypoints.append({Keys.k_pose: {Keys.k_x: x, Keys.k_y: y, Keys.k_theta: theta}, \
+            Keys.k_direction: direction, Keys.k_speed: 0.3})
+    return waypoints
+
+
+# The representation Track replaced, one Pose namedtuple per waypoint
+def parse_pose_list(waypoints):
+    poses = list()
+    for waypoint in waypoints:
+        pose = waypoint[Keys.k_pose]
+        poses.append(Pose(pose[Keys.k_x], pose[Keys.k_y], pose[Keys.k_theta], \
+            waypoint[Keys.k_direction], waypoint[Keys.k_speed]))
+    return poses
+
+
+# Bytes kept alive by the parsed track once the decoded JSON is dropped, and the parse time
+def measure(parse, waypoints_text):
+    gc.collect()
+    tracemalloc.start()
+    waypoints = json.loads(waypoints_text)
+    begin = time.time()
+    track = parse(waypoints)
+    elapsed = time.time() - begin
+    del waypoints
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del track
+    return size, elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Memory of a parsed trajectory as Pose namedtuples versus the columnar Track")
+    parser.add_argument("--waypoints", type=int, default=100000)
+    parser.add_argument("--output", metavar="JSON", help="also save the results to this file")
+    args = parser.parse_args()
+
+    waypoints_text = json.dumps(make_waypoints(args.waypoints))
+    results = dict()
+    for name, parse in [("pose_list", parse_pose_list), ("track", Track.from_waypoints)]:
+        size, elapsed = measure(parse, waypoints_text)
+        results[name] = {"bytes": size, "bytes_per_waypoint": float(size) / args.waypoints, "seconds": elapsed}
+
+    print("%-10s %14s %12s %10s" % ("layout", "bytes", "B/waypoint", "seconds"))
+    for name, res in results.items():
+        print("%-10s %14d %12.1f %10.4f" % (name, res["bytes"], res["bytes_per_waypoint"], res["seconds"]))
+    print("track uses %.1fx less memory" % (float(results["pose_list"]["bytes"]) / results["track"]["bytes"]))
+    if args.output:
+        with open(args.output, "w") as out_f:
+            json.dump({"waypoints": args.waypoints, "results": results}, out_f, indent=4)
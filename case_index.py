@@ -0,0 +1,77 @@
+import io
+import os
+import json
+import math
+from report_keys import Keys, METRIC_NAMES, SIGNED_METRICS
+
+CASE_INDEX_JSON = "case_index.json"
+# The same index as a script, pages opened from file:// can't fetch the JSON file
+CASE_INDEX_SCRIPT = "case_index.js"
+CASE_FIELDS = ["index", "id", "description", "jira_id", "pass", "text_pass", "data_pass", "failed_reasons", \
+    "topics", "metrics"]
+
+
+def flatten_reasons(reasons):
+    if isinstance(reasons, (list, tuple)):
+        for reason in reasons:
+            for flat in flatten_reasons(reason):
+                yield flat
+    elif reasons:
+        yield str(reasons)
+
+
+# Why a case failed: the channels failing the text or data check, then the planner's failure reasons
+def failed_reasons(test_case):
+    reasons = list()
+    for channel in test_case.get(Keys.k_channels, []):
+        topic_name = channel.get(Keys.k_topic_name, "")
+        if not channel.get("text_pass", True):
+            reasons.append("%s text" % topic_name)
+        if not channel.get("data_pass", True):
+            reasons.append("%s data" % topic_name)
+        for reason in flatten_reasons(channel.get(Keys.k_failed_reason)):
+            if reason not in reasons:
+                reasons.append(reason)
+    return reasons
+
+
+def case_entry(test_case):
+    """One row of the index, the values in the CASE_FIELDS order"""
+    descriptions = test_case.get("show_descriptions", {})
+    channels = test_case.get(Keys.k_channels, [])
+    metrics = test_case.get("metrics")
+    if metrics is not None:
+        # NaN isn't JSON, a metric that couldn't be measured is null like a missing one
+        metrics = [metrics.get(name) for name in METRIC_NAMES]
+        metrics = [None if isinstance(value, float) and math.isnan(value) else value for value in metrics]
+    return [test_case["index"], descriptions.get("test_case_id", ""), descriptions.get("description", ""), \
+        descriptions.get("jira_id", ""), 1 if test_case.get(Keys.k_case_pass) else 0, \
+        1 if all(channel.get("text_pass", True) for channel in channels) else 0, \
+        1 if all(channel.get("data_pass", True) for channel in channels) else 0, \
+        failed_reasons(test_case), [channel.get(Keys.k_topic_name, "") for channel in channels], metrics]
+
+
+class CaseIndex(object):
+    """
+    A compact index of the report's cases for the search, filter and sort of js/index.js.
+    The cases are recorded while the report page iterates them, so the streamed report
+    never holds them at once. The rows are lists in the CASE_FIELDS order and the metrics
+    in the METRIC_NAMES order, naming every value again would double the size of the index
+    """
+    def __init__(self):
+        self.cases = list()
+
+    def collect(self, test_cases):
+        for test_case in test_cases:
+            self.cases.append(case_entry(test_case))
+            yield test_case
+
+    def to_dict(self):
+        return {"fields": CASE_FIELDS, "metrics": METRIC_NAMES, "signed_metrics": SIGNED_METRICS, "cases": sorted(self.cases, key=lambda case: case[0])}
+
+    def write(self, report_path):
+        text = json.dumps(self.to_dict(), separators=(",", ":"), allow_nan=False, ensure_ascii=False)
+        with io.open(os.path.join(report_path, CASE_INDEX_JSON), "w", encoding="utf-8") as f:
+            f.write(text)
+        with io.open(os.path.join(report_path, CASE_INDEX_SCRIPT), "w", encoding="utf-8") as f:
+            f.write("var CASE_INDEX = %s;\n" % text)
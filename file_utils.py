@@ -0,0 +1,17 @@
+import os
+import shutil
+import threading
+
+
+# A temp name next to path, private to this process and thread: the report service
+# renders its jobs in threads sharing the asset store and the image cache
+def temp_path(path):
+    return "%s.tmp%s.%s" % (path, os.getpid(), threading.get_ident())
+
+
+def link_or_copy(src, dst):
+    """Hard link src to dst, or copy it when they are on different file systems"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
@@ -0,0 +1,127 @@
+import os
+import shutil
+import hashlib
+import importlib.metadata
+import numpy as np
+from file_utils import temp_path, link_or_copy
+
+# Bump it when RoadPrinter draws differently with the same style parameters
+CACHE_VERSION = 2
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# The installed matplotlib version is part of the keys, read from its metadata so a cache hit
+# never imports matplotlib
+matplotlib_version = None
+
+
+def get_matplotlib_version():
+    global matplotlib_version
+    if matplotlib_version is None:
+        matplotlib_version = importlib.metadata.version("matplotlib")
+    return matplotlib_version
+
+
+def hash_value(h, value):
+    if isinstance(value, np.ndarray):
+        h.update(("ndarray:%s:%s:" % (value.dtype.str, value.shape)).encode("utf-8"))
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif hasattr(value, "columns"):
+        # Columnar tracks are hashed by their arrays
+        hash_value(h, value.columns())
+    elif isinstance(value, (tuple, list)):
+        h.update(("seq:%s:" % len(value)).encode("utf-8"))
+        for item in value:
+            hash_value(h, item)
+    else:
+        h.update(("%s:%r;" % (type(value).__name__, value)).encode("utf-8"))
+
+
+class ImageCache(object):
+    """
+    Content addressed cache of the trajectory pictures. An entry is a directory named
+    after the hash of the parsed Trajectory and the RoadPrinter style, holding the files
+    RoadPrinter writes (pictures and thumbnails) by their index. Hits are hard linked into the report, the least recently used
+    entries are evicted when the cache grows over max_bytes
+    """
+    def __init__(self, _cache_dir, _max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = _cache_dir
+        self.max_bytes = _max_bytes
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    def make_key(self, trajectory, style):
+        h = hashlib.sha1()
+        hash_value(h, (CACHE_VERSION, get_matplotlib_version(), style, trajectory))
+        return h.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def entry_file(self, entry, i, path):
+        return os.path.join(entry, "%s%s" % (i, os.path.splitext(path)[1]))
+
+    # Put the cached files to output_paths, returns False on a miss
+    def fetch(self, key, output_paths):
+        entry = self.entry_path(key)
+        try:
+            for i, output_path in enumerate(output_paths):
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                link_or_copy(self.entry_file(entry, i, output_path), output_path)
+            # Mark the entry as recently used for the eviction
+            os.utime(entry, None)
+        except (IOError, OSError):
+            return False
+        return True
+
+    def store(self, key, output_paths):
+        entry = self.entry_path(key)
+        if os.path.exists(entry):
+            return
+        # Copy to a private dir first then rename it, so the other workers never see half an entry
+        tmp_entry = temp_path(entry)
+        os.makedirs(tmp_entry, exist_ok=True)
+        for i, output_path in enumerate(output_paths):
+            shutil.copyfile(output_path, self.entry_file(tmp_entry, i, output_path))
+        try:
+            os.rename(tmp_entry, entry)
+        except OSError:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+    # Plot the pictures of a RoadPrinter, or take them from the cache without plotting
+    def plot_pictures(self, road_printer):
+        output_paths = road_printer.output_paths()
+        key = self.make_key(road_printer.trajectory, road_printer.style())
+        if self.fetch(key, output_paths):
+            return road_printer.image_paths()
+        image_paths = road_printer.plot_pictures()
+        self.store(key, output_paths)
+        return image_paths
+
+    def entry_size(self, entry):
+        size = 0
+        for name in os.listdir(entry):
+            size += os.path.getsize(os.path.join(entry, name))
+        return size
+
+    # Remove the least recently used entries until the cache fits in max_bytes
+    def evict(self):
+        entries = list()
+        total_size = 0
+        for name in os.listdir(self.cache_dir):
+            # Leave the entries still being stored
+            if ".tmp" in name:
+                continue
+            entry = os.path.join(self.cache_dir, name)
+            try:
+                size = self.entry_size(entry)
+                entries.append((os.path.getmtime(entry), size, entry))
+            except OSError:
+                continue
+            total_size += size
+        entries.sort()
+        for _, size, entry in entries:
+            if total_size <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total_size -= size
+        return total_size
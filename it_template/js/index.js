@@ -0,0 +1,183 @@
+function show_it_by_id(tbl_id) {
+  if($(tbl_id).hasClass("hide")) {
+    $(tbl_id).removeClass("hide");
+  }else {
+    $(tbl_id).addClass("hide");
+  }
+}
+
+// Lazy reports keep the case details in a cases/*.js script, run it when the case is first shown.
+// A script tag also loads from file://, where the browsers block fetching a fragment
+function load_fragment(tbl_id) {
+  var fragment = $(tbl_id).attr("data-fragment");
+  if(fragment && !$(tbl_id).hasClass("loaded")) {
+    $(tbl_id).addClass("loaded");
+    var script = document.createElement("script");
+    script.src = fragment;
+    script.onerror = function() {
+      $(tbl_id).removeClass("loaded");
+      $(tbl_id).text("Can't load the case details from " + fragment);
+    };
+    document.body.appendChild(script);
+  }
+}
+
+// Called by a cases/*.js script with its own path and the detail fragment of the case
+function fill_case(fragment, html) {
+  $('[data-fragment="' + fragment + '"]').html(html);
+}
+
+function show_it(idx) {
+    tbl_id = "#tbl_content"+idx  
+    load_fragment(tbl_id)
+    show_it_by_id(tbl_id)
+}
+
+// Search, filter and sort the cases with the case index written next to the report
+// (case_index.js), the cards are only looked up by id and touched when they change
+var case_search = {
+  rows: [],
+  cards: {},
+  shown: {},
+  order: "index",
+  timer: null
+};
+
+function case_field_positions(fields) {
+  var pos = {};
+  for(var i = 0; i < fields.length; i++) {
+    pos[fields[i]] = i;
+  }
+  return pos;
+}
+
+function init_case_search() {
+  if(typeof CASE_INDEX === "undefined" || !document.getElementById("case_search")) {
+    $("#case_search_bar").addClass("hide");
+    return;
+  }
+  var f = case_field_positions(CASE_INDEX.fields);
+  var sort_select = document.getElementById("case_sort");
+  for(var m = 0; m < CASE_INDEX.metrics.length; m++) {
+    var option = document.createElement("option");
+    option.value = m;
+    option.text = CASE_INDEX.metrics[m] + " (worst first)";
+    sort_select.appendChild(option);
+  }
+  for(var i = 0; i < CASE_INDEX.cases.length; i++) {
+    var c = CASE_INDEX.cases[i];
+    // Everything the search box matches, lower cased once
+    var text = [c[f.id], c[f.description], c[f.jira_id], c[f.failed_reasons].join(" "),
+      c[f.topics].join(" ")].join("\n").toLowerCase();
+    case_search.rows.push({index: c[f.index], pass: c[f.pass], text_pass: c[f.text_pass],
+      data_pass: c[f.data_pass], metrics: c[f.metrics], text: text});
+    case_search.shown[c[f.index]] = true;
+  }
+  $("#case_search").on("input", function() {
+    clearTimeout(case_search.timer);
+    case_search.timer = setTimeout(apply_case_search, 150);
+  });
+  $("#case_filter, #case_sort").on("change", apply_case_search);
+  update_case_count(case_search.rows.length);
+}
+
+function case_card(index) {
+  var card = case_search.cards[index];
+  if(card === undefined) {
+    card = case_search.cards[index] = document.getElementById("case" + index);
+  }
+  return card;
+}
+
+function case_matches(row, terms, filter) {
+  if((filter === "failed" && row.pass) || (filter === "passed" && !row.pass) ||
+     (filter === "text_failed" && row.text_pass) || (filter === "data_failed" && row.data_pass)) {
+    return false;
+  }
+  for(var i = 0; i < terms.length; i++) {
+    if(row.text.indexOf(terms[i]) < 0) {
+      return false;
+    }
+  }
+  return true;
+}
+
+// The worst (biggest) metric first, the cases without it last, then the result file order.
+// The signed metrics are worst the farthest from 0
+function case_comparator(order) {
+  if(order === "index") {
+    return function(a, b) { return a.index - b.index; };
+  }
+  var m = parseInt(order, 10);
+  var signed = (CASE_INDEX.signed_metrics || []).indexOf(CASE_INDEX.metrics[m]) >= 0;
+  function deviation(row) {
+    var value = row.metrics ? row.metrics[m] : null;
+    if(value === null || value === undefined) {
+      return null;
+    }
+    return signed ? Math.abs(value) : value;
+  }
+  return function(a, b) {
+    var va = deviation(a);
+    var vb = deviation(b);
+    if(va === null) {
+      return vb === null ? a.index - b.index : 1;
+    }
+    if(vb === null) {
+      return -1;
+    }
+    return vb - va || a.index - b.index;
+  };
+}
+
+function apply_case_search() {
+  var terms = $("#case_search").val().toLowerCase().split(/\s+/).filter(function(t) { return t; });
+  var filter = $("#case_filter").val();
+  var order = $("#case_sort").val();
+  var count = 0;
+  for(var i = 0; i < case_search.rows.length; i++) {
+    var row = case_search.rows[i];
+    var show = case_matches(row, terms, filter);
+    if(show) {
+      count++;
+    }
+    if(show !== case_search.shown[row.index]) {
+      var card = case_card(row.index);
+      if(card) {
+        card.style.display = show ? "" : "none";
+      }
+      case_search.shown[row.index] = show;
+    }
+  }
+  if(order !== case_search.order) {
+    sort_case_cards(order);
+  }
+  update_case_count(count);
+}
+
+// Move the cards into the new order, each list is rebuilt in one fragment
+function sort_case_cards(order) {
+  var rows = case_search.rows.slice().sort(case_comparator(order));
+  var lists = {};
+  for(var i = 0; i < rows.length; i++) {
+    var card = case_card(rows[i].index);
+    if(!card) {
+      continue;
+    }
+    var list_id = card.parentNode.id;
+    if(!lists[list_id]) {
+      lists[list_id] = {parent: card.parentNode, fragment: document.createDocumentFragment()};
+    }
+    lists[list_id].fragment.appendChild(card);
+  }
+  for(var id in lists) {
+    lists[id].parent.appendChild(lists[id].fragment);
+  }
+  case_search.order = order;
+}
+
+function update_case_count(count) {
+  $("#case_count").text(count + " / " + case_search.rows.length + " cases");
+}
+
+$(init_case_search);
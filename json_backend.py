@@ -0,0 +1,59 @@
+import os
+import json
+import importlib
+
+# Tried in this order by "auto", the standard library is always there
+BACKEND_NAMES = ["orjson", "ujson", "json"]
+
+
+class JsonBackend(object):
+    """
+    The loads of a JSON module. orjson and ujson are much faster than the standard library,
+    but refuse some documents it accepts (NaN, Infinity, integers over 64 bits), those are
+    decoded again with the standard library
+    """
+    def __init__(self, _name, _module):
+        self.name = _name
+        self.module = _module
+
+    def loads(self, data):
+        try:
+            return self.module.loads(data)
+        except ValueError:
+            if self.module is json:
+                raise
+            return json.loads(data)
+
+    def load(self, path):
+        with open(path, "rb") as f:
+            return self.loads(f.read())
+
+
+def find_backend(name="auto"):
+    if name == "auto":
+        for backend_name in BACKEND_NAMES:
+            try:
+                return JsonBackend(backend_name, importlib.import_module(backend_name))
+            except ImportError:
+                continue
+    if name not in BACKEND_NAMES:
+        raise ValueError("Unknown JSON backend '%s', use auto or one of %s" % (name, ", ".join(BACKEND_NAMES)))
+    return JsonBackend(name, importlib.import_module(name))
+
+
+backend = find_backend(os.environ.get("REPORT_JSON_BACKEND", "auto"))
+
+
+# Switch the backend of this process, the plotting workers forked after it use it too
+def use_backend(name):
+    global backend
+    backend = find_backend(name)
+    return backend
+
+
+def loads(data):
+    return backend.loads(data)
+
+
+def load(path):
+    return backend.load(path)
@@ -0,0 +1,139 @@
+import os
+import glob
+import argparse
+import multiprocessing
+from collections import OrderedDict, namedtuple
+from report_gen import ReportGen, Keys, add_shared_arguments, make_shared_options
+from stage_timer import configure_logging
+
+Shard = namedtuple("Shard", ["module_name", "result_file", "image_dir"])
+
+
+# Load and prepare one shard, top level so it can run inside a worker process,
+# the shard pictures go to their own images/<shard number> dir
+def load_shard(task):
+    shard, tpl_path, report_path, image_cache = task
+    rg = ReportGen(shard.result_file, tpl_path, report_path, "", shard.module_name, image_cache=image_cache)
+    rg.image_path = os.path.join(report_path, shard.image_dir)
+    json_result = rg.load_result()
+    # The passed and failed lists hold all the test cases already
+    json_result.pop(Keys.k_test_cases, None)
+    return json_result
+
+
+def make_pass_rate(passed_cases, failed_cases):
+    total_cases = passed_cases + failed_cases
+    if total_cases == 0:
+        return 0.0
+    return round(100.0 * passed_cases / total_cases, 2)
+
+
+# Expand "module=glob" arguments to the shards, in the order given
+def parse_shards(shard_args):
+    shards = list()
+    for shard_arg in shard_args:
+        module_name, _, pattern = shard_arg.partition("=")
+        if not pattern:
+            raise ValueError("Shard '%s' is not like {module_name}={result_json_glob}" % shard_arg)
+        result_files = sorted(glob.glob(pattern))
+        if not result_files:
+            raise ValueError("No result file matches '%s'" % pattern)
+        for result_file in result_files:
+            shards.append(Shard(module_name, result_file, os.path.join("images", str(len(shards)))))
+    return shards
+
+
+class MergedReportGen(object):
+    """
+    One report for many result files, like the shards of several modules. The shards are
+    loaded (and their failed planning cases plotted) in parallel worker processes, then
+    merged into one section per module with the pass counts summed over the shards
+    """
+    def __init__(self, shards, tpl_path, report_path, report_name, jobs=1, image_cache=None, \
+        bytecode_cache_dir=None, lazy_cases=False):
+        self.shards = shards
+        self.tpl_path = tpl_path
+        self.report_path = report_path
+        self.jobs = jobs if jobs > 0 else multiprocessing.cpu_count()
+        self.image_cache = image_cache
+        # Renders the merged report, sharing the dirs and template helpers of a single report
+        self.renderer = ReportGen(None, tpl_path, report_path, report_name, None, \
+            bytecode_cache_dir=bytecode_cache_dir, lazy_cases=lazy_cases)
+        self.renderer.template_name = 'merged-index-tpl.html'
+
+    def prepare_dirs(self):
+        self.renderer.prepare_dirs()
+        for shard in self.shards:
+            image_path = os.path.join(self.report_path, shard.image_dir)
+            if not os.path.exists(image_path):
+                os.makedirs(image_path)
+
+    def load_shards(self):
+        tasks = [(shard, self.tpl_path, self.report_path, self.image_cache) for shard in self.shards]
+        if self.jobs > 1 and len(tasks) > 1:
+            pool = multiprocessing.Pool(min(self.jobs, len(tasks)))
+            try:
+                return pool.map(load_shard, tasks, chunksize=1)
+            finally:
+                pool.close()
+                pool.join()
+        return [load_shard(task) for task in tasks]
+
+    def merge(self, shard_results):
+        modules = OrderedDict()
+        # Case indexes are the element ids of the report, keep them unique over the shards
+        index_offset = 0
+        for shard, shard_result in zip(self.shards, shard_results):
+            module = modules.get(shard.module_name)
+            if module is None:
+                module = modules[shard.module_name] = {"module_name": shard.module_name, \
+                    "passed_cases": 0, "failed_cases": 0, "failed_test_cases": [], "passed_test_cases": []}
+            shard_cases = shard_result["failed_test_cases"] + shard_result["passed_test_cases"]
+            for test_case in shard_cases:
+                test_case["index"] += index_offset
+            index_offset += len(shard_cases)
+            module["passed_cases"] += shard_result.get("passed_cases", len(shard_result["passed_test_cases"]))
+            module["failed_cases"] += shard_result.get("failed_cases", len(shard_result["failed_test_cases"]))
+            module["failed_test_cases"].extend(shard_result["failed_test_cases"])
+            module["passed_test_cases"].extend(shard_result["passed_test_cases"])
+
+        merged = {"modules": list(modules.values()), "passed_cases": 0, "failed_cases": 0}
+        for module in merged["modules"]:
+            module["pass_rate"] = make_pass_rate(module["passed_cases"], module["failed_cases"])
+            merged["passed_cases"] += module["passed_cases"]
+            merged["failed_cases"] += module["failed_cases"]
+            self.renderer.add_case_lists(module, module["failed_test_cases"], module["passed_test_cases"])
+        merged["pass_rate"] = make_pass_rate(merged["passed_cases"], merged["failed_cases"])
+        merged["all_pass"] = merged["failed_cases"] == 0
+        merged["report_name"] = "Integration Test Report for %s" % self.renderer.report_name
+        merged["lazy_cases"] = self.renderer.lazy_cases
+        return merged
+
+    def generate(self):
+        merged = self.merge(self.load_shards())
+        self.renderer.render_report(merged)
+        if self.image_cache is not None:
+            self.image_cache.evict()
+        return merged
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        usage="python merged_report_gen.py {it_template_dir} {report_dir} {Report_name} "
+            "{module_name}={result_json_glob} [...] [options]",
+        epilog="Example: python merged_report_gen.py ./it_template ./report 'Nightly BVT' "
+            "'planning=./shards/planning-*.json' 'perception=./shards/perception-*.json' --jobs 8")
+    parser.add_argument("it_tpl_dir")
+    parser.add_argument("report_dir")
+    parser.add_argument("report_name")
+    parser.add_argument("shards", nargs="+", metavar="module_name=result_json_glob")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+        help="worker processes loading the shards, 0 means one per CPU")
+    add_shared_arguments(parser)
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    mrg = MergedReportGen(parse_shards(args.shards), args.it_tpl_dir, args.report_dir, args.report_name, \
+        jobs=args.jobs, **make_shared_options(args))
+    mrg.prepare_dirs()
+    mrg.generate()
@@ -1,11 +1,18 @@
 import os
-import sys
+import re
 import json
 import math
+import time
+import logging
+import argparse
 from collections import namedtuple
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import matplotlib as mpl
+import numpy as np
+from result_reader import ResultReader
+from report_keys import Keys, Consts, IMAGE_FORMATS, thumbnail_path
+from stage_timer import StageTimer, profile, configure_logging
+from track_simplify import simplify_mask
+
+logger = logging.getLogger(__name__)
 
 
 Point = namedtuple("Point", ["x", "y"])
@@ -19,80 +26,166 @@ CaseInfo = namedtuple("CaseInfo", ["case_id", "description"])
 
 TrajectResult = namedtuple("TrajectResult", ["result", "case_info", "trajectory"])
 
-class Keys(object):
-    k_test_cases = "test_cases"
-    k_descriptions = "descriptions"
-    k_description = "Description"
-    k_case_id = "Test Case ID"
-    k_case_pass = "pass"
-    k_channels = "channels"
-    k_topic_name = "topic_name"
-    k_failed_reason = "plan_failed_reasons"
-    k_car_loc = "car_loc"
-    k_x = "x"
-    k_y = "y"
-    k_theta = "theta"
-    k_parking_space = "parking_space"
-    k_p0 = "p0"
-    k_p1 = "p1"
-    k_p2 = "p2"
-    k_p3 = "p3"
-    k_out_messages = "output_messages"
-    k_waypoints = "waypoints"
-    k_direction = "direction"
-    k_speed = "speed"
-    k_pose = "pose"
-    k_saved_images = "saved_images"
-
-
-class Consts(object):
-    TRAJECTORY_TOPIC_NAME = "TrajectoryFully"
-    FullFailReasonColl = ["TypeValidationFailure",
-                            "StartEndDistanceFailure",
-                            "TurnCountDiffFailure",
-                            "TurnCurveRateFailure"]
-class State(object):
-    Unknown = 0
-    BeginActual = 1
-    EndActual = 2
-    BeginExpect = 3
-    EndExpect = 4
+# matplotlib and PIL take most of the import time of this module and parsing the result
+# file doesn't need them, they are only imported when the first picture is drawn, not on
+# an image cache hit
+patches = transforms = Figure = FigureCanvasAgg = LineCollection = Image = None
+
+
+def import_plotting():
+    global patches, transforms, Figure, FigureCanvasAgg, LineCollection, Image
+    if Figure is not None:
+        return
+    import matplotlib
+    # Only files are drawn, never pick an interactive backend
+    matplotlib.use("Agg", force=True)
+    import matplotlib.patches as patches
+    import matplotlib.transforms as transforms
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.collections import LineCollection
+    from PIL import Image
+
+
+class Track(object):
+    """
+    A whole road in compact columns instead of one Pose per waypoint: x, y, theta and speed
+    are float64 arrays, so a row gives back the parsed values exactly, and the direction
+    strings are stored as int8 codes into the direction_names of the track
+    """
+    __slots__ = ("x", "y", "theta", "speed", "direction_codes", "direction_names")
+
+    def __init__(self, x, y, theta, speed, direction_codes, direction_names):
+        self.x = x
+        self.y = y
+        self.theta = theta
+        self.speed = speed
+        self.direction_codes = direction_codes
+        self.direction_names = direction_names
+
+    @classmethod
+    def from_waypoints(cls, waypoints):
+        count = len(waypoints)
+        poses = [waypoint[Keys.k_pose] for waypoint in waypoints]
+        x = np.fromiter((pose[Keys.k_x] for pose in poses), dtype=np.float64, count=count)
+        y = np.fromiter((pose[Keys.k_y] for pose in poses), dtype=np.float64, count=count)
+        theta = np.fromiter((pose[Keys.k_theta] for pose in poses), dtype=np.float64, count=count)
+        speed = np.fromiter((waypoint[Keys.k_speed] for waypoint in waypoints), dtype=np.float64, count=count)
+        direction_names = list()
+        name_codes = dict()
+        direction_codes = np.empty(count, dtype=np.int8)
+        for i, waypoint in enumerate(waypoints):
+            direction = waypoint[Keys.k_direction]
+            code = name_codes.get(direction)
+            if code is None:
+                code = name_codes[direction] = len(direction_names)
+                direction_names.append(direction)
+            direction_codes[i] = code
+        return cls(x, y, theta, speed, direction_codes, tuple(direction_names))
+
+    @property
+    def direction(self):
+        return np.array(self.direction_names, dtype=object)[self.direction_codes]
+
+    # The columns in a stable order, used to hash the track
+    def columns(self):
+        return (self.x, self.y, self.theta, self.speed, self.direction_codes, self.direction_names)
+
+    @property
+    def nbytes(self):
+        return self.x.nbytes + self.y.nbytes + self.theta.nbytes + self.speed.nbytes + self.direction_codes.nbytes
+
+    def __len__(self):
+        return len(self.x)
+
+    # The waypoints selected by a boolean mask or an index array, as a new Track
+    def select(self, keep):
+        return Track(self.x[keep], self.y[keep], self.theta[keep], self.speed[keep], \
+            self.direction_codes[keep], self.direction_names)
+
+    def __getitem__(self, i):
+        return Pose(float(self.x[i]), float(self.y[i]), float(self.theta[i]), \
+            self.direction_names[self.direction_codes[i]], float(self.speed[i]))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
 
 class OutMessageParser(object):
-    def __init__(self, in_msg_list):
-        self.msg_list = in_msg_list
+    """
+    Extract the Actual/Expect JSON payloads from a raw TrajectoryFully output message.
+    A section starts at a "<br/>" separated line that strips to the section marker and
+    ends at the next blank line, the message is scanned once with str.find and the
+    payloads are decoded in place instead of splitting the message into lines
+    """
+    SEPARATOR = "<br/>"
+    ACTUAL_MARKER = "Actual Message:"
+    EXPECT_MARKER = "Expect Message:"
+    WHITESPACE = re.compile(r"\s*")
+
+    def __init__(self, raw_message):
+        self.message = raw_message
+
+    def line_end(self, pos):
+        end = self.message.find(self.SEPARATOR, pos)
+        return len(self.message) if end == -1 else end
+
+    def is_blank(self, start, end):
+        return self.WHITESPACE.match(self.message, start, end).end() == end
+
+    # Find the next line stripping to one of the markers, returns (marker, end of the line)
+    def find_marker(self, pos):
+        msg = self.message
+        while True:
+            candidates = [(msg.find(marker, pos), marker) for marker in (self.ACTUAL_MARKER, self.EXPECT_MARKER)]
+            candidates = [(index, marker) for index, marker in candidates if index != -1]
+            if not candidates:
+                return None, len(msg)
+            index, marker = min(candidates)
+            line_start = msg.rfind(self.SEPARATOR, 0, index)
+            line_start = 0 if line_start == -1 else line_start + len(self.SEPARATOR)
+            line_end = self.line_end(index)
+            if self.is_blank(line_start, index) and self.is_blank(index + len(marker), line_end):
+                return marker, line_end
+            pos = index + 1
+
+    # (start, end) of the non blank lines after a marker line, and where the section ends
+    def section_lines(self, pos):
+        lines = list()
+        msg_len = len(self.message)
+        while pos < msg_len:
+            pos += len(self.SEPARATOR)
+            end = self.line_end(pos)
+            if self.is_blank(pos, end):
+                return lines, end
+            lines.append((pos, end))
+            pos = end
+        return lines, pos
+
+    def decode(self, lines):
+        msg = self.message
+        if len(lines) == 1:
+            start, end = lines[0]
+            start = self.WHITESPACE.match(msg, start, end).end()
+            try:
+                value, value_end = json.JSONDecoder().raw_decode(msg, start)
+                if value_end <= end and self.is_blank(value_end, end):
+                    return value
+            except ValueError:
+                pass
+        return json.loads("".join(msg[start:end] for start, end in lines))
 
     def parse(self):
-        state = State.Unknown
-        acutal_lines = []
-        expect_lines = []
-        for msg_line in self.msg_list:
-            if state == State.Unknown:
-                if msg_line.strip() == "Actual Message:":
-                    state = State.BeginActual
-                if msg_line.strip() == "Expect Message:":
-                    state = State.BeginExpect
-
-            elif state == State.BeginActual:
-                if msg_line.strip() != "":
-                    acutal_lines.append(msg_line)
-                if msg_line.strip() == "":
-                    state = State.Unknown
-            
-            elif state == State.BeginExpect:
-                if msg_line.strip() != "":
-                    expect_lines.append(msg_line)
-                
-                if msg_line.strip() == "":
-                    state = State.Unknown
-        actual_msg = ""
-        expect_msg = ""
-        for line in acutal_lines:
-            actual_msg += line
-        
-        for line in expect_lines:
-            expect_msg += line
-        return json.loads(actual_msg), json.loads(expect_msg)
+        sections = {self.ACTUAL_MARKER: [], self.EXPECT_MARKER: []}
+        pos = 0
+        while True:
+            marker, pos = self.find_marker(pos)
+            if marker is None:
+                break
+            lines, pos = self.section_lines(pos)
+            sections[marker].extend(lines)
+        return self.decode(sections[self.ACTUAL_MARKER]), self.decode(sections[self.EXPECT_MARKER])
 
 
 class RoadPrinter(object):
@@ -104,19 +197,105 @@ class RoadPrinter(object):
         self.car_circle_size = 180
         self.car_length = 4.765
         self.car_width = 1.845
+        self.direction_line_length = 1.5
+        self.show_directions = True
+        self.fig_size = (14.0, 14.0)
+        self.dpi = 80
+        # Max distance in meters of a dropped waypoint to the plotted line, None plots every waypoint
+        self.simplify_tolerance = None
+        # One of IMAGE_FORMATS
+        self.image_format = "png"
+        # Draw all the expect tracks of a case in one picture, a grid of subplots of combined_size inches
+        self.combined = False
+        self.combined_size = 7.0
+        # Also save a thumbnail of each picture fitting in this many pixels, None for no thumbnails
+        self.thumbnail_size = None
+        self.figure = None
+        self.ax = None
+
+    # Use an explicit Figure on the Agg canvas instead of pyplot's global figure manager,
+    # the figure is reused for every expect track and released in close_plot. The subplot
+    # index of a combined picture starts at 1, the figure is cleared for the first one only
+    def init_plot(self, rows=1, cols=1, index=1):
+        logger.debug("init_plot")
+        import_plotting()
+        if self.figure is None:
+            fig_size = self.fig_size
+            if rows * cols > 1:
+                fig_size = (self.combined_size * cols, self.combined_size * rows)
+            self.figure = Figure(figsize=fig_size, dpi=self.dpi)
+            FigureCanvasAgg(self.figure)
+        elif index == 1:
+            self.figure.clear()
+        self.ax = self.figure.add_subplot(rows, cols, index)
+
+    # Everything that changes the look of the pictures, part of the image cache key
+    def style(self):
+        return (self.circle_size, self.car_circle_size, self.car_length, self.car_width, \
+            self.direction_line_length, self.show_directions, self.fig_size, self.dpi, self.simplify_tolerance, \
+            self.image_format, self.combined, self.combined_size, self.thumbnail_size)
+
+    # One picture per expect track, or a single one for all of them, named after the test case
+    def image_paths(self):
+        case_id = self.case_info.case_id
+        description = self.case_info.description
+        description = description.replace("/", "\\")
+        ext = IMAGE_FORMATS[self.image_format][0]
+        if self.combined:
+            if not self.trajectory.expect_tracks:
+                return []
+            return [os.path.join(self.image_path, "%s_%s_all.%s" % (case_id, description, ext))]
+        image_paths = list()
+        for i in range(len(self.trajectory.expect_tracks)):
+            img_name = "%s_%s_%s.%s" % (case_id, description, i, ext)
+            # img_name = img_name.replace(" ", "_")
+            image_paths.append(os.path.join(self.image_path, img_name))
+        return image_paths
 
-    def init_plot(self):
-        print("init_plot")
-        plt.figure(figsize=(14.0, 14.0), dpi=80)
+    # Every file plot_pictures writes, the pictures and then their thumbnails
+    def output_paths(self):
+        image_paths = self.image_paths()
+        if self.thumbnail_size is None:
+            return image_paths
+        return image_paths + [thumbnail_path(image_path) for image_path in image_paths]
+
+    def save_image(self, img_path):
+        import_plotting()
+        # The old picture may be hard linked to the image cache, don't write through it
+        if os.path.exists(img_path):
+            os.remove(img_path)
+        ext, savefig_kwargs = IMAGE_FORMATS[self.image_format]
+        if savefig_kwargs is None:
+            self.figure.canvas.draw()
+            image = Image.fromarray(np.asarray(self.figure.canvas.buffer_rgba())).convert("RGB")
+            image.quantize(256, method=Image.Quantize.FASTOCTREE).save(img_path)
+        else:
+            self.figure.savefig(img_path, format=ext, **savefig_kwargs)
+        if self.thumbnail_size is not None:
+            self.save_thumbnail(img_path)
+
+    def save_thumbnail(self, img_path):
+        import_plotting()
+        thumb_path = thumbnail_path(img_path)
+        if os.path.exists(thumb_path):
+            os.remove(thumb_path)
+        if img_path.endswith(".svg"):
+            width, height = self.figure.get_size_inches()
+            self.figure.savefig(thumb_path, format="png", dpi=float(self.thumbnail_size) / max(width, height))
+            return
+        # Resample the palette pictures in RGB, not by picking palette entries
+        image = Image.open(img_path).convert("RGB")
+        image.thumbnail((self.thumbnail_size, self.thumbnail_size))
+        image.save(thumb_path)
+
+    def close_plot(self):
+        if self.figure is not None:
+            self.figure.clear()
+        self.figure = None
+        self.ax = None
         
-    def plot_one_waypoint_line(self, waypoints, color_, label_, line_width=0.5):
-        x_list = list()
-        y_list = list()
-
-        for waypoint in waypoints:
-            x_list.append(waypoint.x)
-            y_list.append(waypoint.y)
-        plt.plot(x_list, y_list, color=color_, linewidth=line_width, label=label_)
+    def plot_one_waypoint_line(self, track, color_, label_, line_width=0.5):
+        self.ax.plot(track.x, track.y, color=color_, linewidth=line_width, label=label_)
 
     def make_failed_reason(self, failed_rea):
         failed_rea_s = ""
@@ -124,44 +303,53 @@ class RoadPrinter(object):
             failed_rea_s += rea + ", "
         return failed_rea_s[:-2]
 
-    def plot_waypoint_line(self, expect_track, actual_track, failed_rea):
+    # Drop the waypoints that don't change the picture, the start, end and the direction
+    # switches are always kept. Returns the track to plot and the number of dropped waypoints
+    def simplify(self, track):
+        if self.simplify_tolerance is None:
+            return track, 0
+        keep = simplify_mask(track, self.simplify_tolerance)
+        return track.select(keep), len(track) - int(np.count_nonzero(keep))
+
+    def make_dropped_label(self, dropped):
+        if self.simplify_tolerance is None:
+            return ""
+        return " (%s waypoints dropped)" % dropped
+
+    def plot_waypoint_line(self, expect_track, actual_track, failed_rea, expect_dropped=0, actual_dropped=0):
         failed_rea_s = self.make_failed_reason(failed_rea)
-        expect_label = "expect tracks: %s" % failed_rea_s
-        actual_label = "actual tracks: %s" % failed_rea_s
+        expect_label = "expect tracks: %s%s" % (failed_rea_s, self.make_dropped_label(expect_dropped))
+        actual_label = "actual tracks: %s%s" % (failed_rea_s, self.make_dropped_label(actual_dropped))
         self.plot_one_waypoint_line(expect_track, "green", expect_label, line_width=2)
         self.plot_one_waypoint_line(actual_track, "red", actual_label, line_width=2)
     
-    def plot_one_direction_line(self, waypoint, color_):
-        x = waypoint.x
-        y = waypoint.y
-        theta = -waypoint.theta
-        x2 = x + 1.5*math.cos(theta)
-        y2 = y + 1.5*math.sin(theta)
-        plt.plot([x, x2], [y, y2], color=color_, linewidth=0.5)
-        
+    # Draw the heading of every waypoint of a track as one LineCollection
+    def plot_direction_lines(self, track, color_):
+        x2 = track.x + self.direction_line_length * np.cos(track.theta)
+        y2 = track.y + self.direction_line_length * np.sin(track.theta)
+        # segments in shape (waypoints, 2 points, xy)
+        segments = np.stack((np.column_stack((track.x, track.y)), np.column_stack((x2, y2))), axis=1)
+        self.ax.add_collection(LineCollection(segments, colors=color_, linewidths=0.5))
 
     def plot_waypoint_direction_lines(self, expect_track, actual_track):
-        for waypoint in expect_track:
-            self.plot_one_direction_line(waypoint, "green")
-        for waypoint in actual_track:
-            self.plot_one_direction_line(waypoint, "red")
+        self.plot_direction_lines(expect_track, "green")
+        self.plot_direction_lines(actual_track, "red")
 
-    def plot_waypoint_circle(self, waypoints, color):
-        for waypoint in waypoints:
-            plt.scatter(waypoint.x, waypoint.y, s=self.circle_size, \
-                facecolors='none', edgecolors=color)
+    def plot_waypoint_circle(self, track, color):
+        self.ax.scatter(track.x, track.y, s=self.circle_size, \
+            facecolors='none', edgecolors=color)
 
     def plot_one_waypoint(self, expect_track, actual_track):
         self.plot_waypoint_circle(expect_track, "red")
         self.plot_waypoint_circle(actual_track, "black")
     
     def plot_car_pos(self, car_loc):
-        print("plot car pos...")
+        logger.debug("plot car pos %s", car_loc)
         x = car_loc.x
         y = car_loc.y
         theta = car_loc.theta
         car_loc_label = "car loc: x: %s, y: %s, theta: %s" % (x, y, theta)
-        plt.scatter(x, y, s=self.car_circle_size, color="red", label=car_loc_label)
+        self.ax.scatter(x, y, s=self.car_circle_size, color="red", label=car_loc_label)
         
     def plot_car_direction_arrow(self, waypoint, color_):
         x = waypoint.x
@@ -171,14 +359,13 @@ class RoadPrinter(object):
         degree = theta* 180/ math.pi
         x2 = x + 1.5
         y2 = y
-        ax = plt.axes()
         arr = patches.Arrow(x, y, x2, y2, width=0.1)
-        t2 = mpl.transforms.Affine2D().rotate_deg(degree) + ax.transData
+        t2 = transforms.Affine2D().rotate_deg(degree) + self.ax.transData
         arr.set_transform(t2) 
-        ax.add_patch(arr)
+        self.ax.add_patch(arr)
 
     def plot_car_body(self, car_loc):
-        print("plot car body...")
+        logger.debug("plot car body")
         x = car_loc.x
         y = car_loc.y
         theta = car_loc.theta
@@ -187,20 +374,17 @@ class RoadPrinter(object):
         y -= self.car_width / 2
         car_rec = patches.Rectangle((x, y), self.car_length, self.car_width, \
             color="blue", fill=False)
-        ax = plt.axes()
-        t2 = mpl.transforms.Affine2D().rotate_deg(degree) + ax.transData
+        t2 = transforms.Affine2D().rotate_deg(degree) + self.ax.transData
         car_rec.set_transform(t2) 
-        ax.add_patch(car_rec)
+        self.ax.add_patch(car_rec)
 
     def plot_car(self, car_loc):
-        print("car loc...")
         self.plot_car_pos(car_loc)
         self.plot_car_direction_arrow(car_loc, "green")
         self.plot_car_body(car_loc)
 
     def plot_lots(self, parking_space):
-        print("parking")
-        print(parking_space)
+        logger.debug("plot parking space %s", parking_space)
         points = list()
         points.append(parking_space.p0)
         points.append(parking_space.p1)
@@ -211,35 +395,47 @@ class RoadPrinter(object):
         for point in points:
             x_list.append(point.x)
             y_list.append(point.y)
-        plt.plot(x_list, y_list, color='green', linewidth=3.0)
+        self.ax.plot(x_list, y_list, color='green', linewidth=3.0)
 
     def plot_pictures(self):
-        print("Start to plot pictures...")
+        logger.debug("Start to plot pictures of case %s", self.case_info.case_id)
         expect_tracks = self.trajectory.expect_tracks
         actual_track = self.trajectory.actual_track
         plan_failed_reas = self.trajectory.plan_failed_reasons
         car_loc = self.trajectory.car_loc
         parking_space = self.trajectory.parking_space
-        image_paths = list()
+        try:
+            return self.plot_expect_tracks(expect_tracks, actual_track, plan_failed_reas, \
+                car_loc, parking_space)
+        finally:
+            self.close_plot()
+
+    def plot_expect_tracks(self, expect_tracks, actual_track, plan_failed_reas, car_loc, parking_space):
+        image_paths = self.image_paths()
+        actual_track, actual_dropped = self.simplify(actual_track)
+        # The subplot grid of a combined picture, as square as possible
+        cols = int(math.ceil(math.sqrt(len(expect_tracks)))) if self.combined else 1
+        rows = int(math.ceil(len(expect_tracks) / float(cols))) if self.combined else 1
         for i, expect_track in enumerate(expect_tracks):
-            self.init_plot()
+            expect_track, expect_dropped = self.simplify(expect_track)
+            if self.combined:
+                self.init_plot(rows, cols, i + 1)
+                self.ax.set_title("expect track %s" % i)
+            else:
+                self.init_plot()
             self.plot_one_waypoint(expect_track, actual_track)
             failed_rea = plan_failed_reas[i]
-            print(failed_rea)
-            self.plot_waypoint_line(expect_track, actual_track, failed_rea)
-            # It's too messy to print out the direction lines, so omit them
-            # self.plot_waypoint_direction_lines(expect_track, actual_track)
+            logger.debug("expect track %s failed reasons: %s", i, failed_rea)
+            self.plot_waypoint_line(expect_track, actual_track, failed_rea, expect_dropped, actual_dropped)
+            if self.show_directions:
+                self.plot_waypoint_direction_lines(expect_track, actual_track)
             self.plot_car(car_loc)
             self.plot_lots(parking_space)
-            plt.legend(loc='best')
-            case_id = self.case_info.case_id
-            description = self.case_info.description
-            description = description.replace("/", "\\")
-            img_name = "%s_%s_%s.png" % (case_id, description, i)
-            # img_name = img_name.replace(" ", "_")
-            img_path = os.path.join(self.image_path, img_name)
-            plt.savefig(img_path)
-            image_paths.append(img_path)
+            self.ax.legend(loc='best')
+            if not self.combined:
+                self.save_image(image_paths[i])
+        if self.combined and expect_tracks:
+            self.save_image(image_paths[0])
         return image_paths
             
 
@@ -248,15 +444,7 @@ class TrackParser(object):
         self.case_js = _case_js
 
     def parse_waypoints(self, waypoints):
-        poses = list()
-        for waypoint in waypoints:
-            direction = waypoint[Keys.k_direction]
-            speed = waypoint[Keys.k_speed]
-            x = waypoint[Keys.k_pose][Keys.k_x]
-            y = waypoint[Keys.k_pose][Keys.k_y]
-            theta = waypoint[Keys.k_pose][Keys.k_theta]
-            poses.append(Pose(x, y, theta, direction, speed))
-        return poses
+        return Track.from_waypoints(waypoints)
 
 
     def parse_trajectory_channel(self, channel):
@@ -265,12 +453,12 @@ class TrackParser(object):
             return None
 
         plan_failed_reas = channel[Keys.k_failed_reason]
-        print(plan_failed_reas)
+        logger.debug("plan failed reasons: %s", plan_failed_reas)
 
         car_loc_js = channel[Keys.k_car_loc]
         car_loc = Pose(car_loc_js[Keys.k_x], car_loc_js[Keys.k_y],\
              car_loc_js[Keys.k_theta], 0, 0)
-        print(car_loc)
+        logger.debug("car loc: %s", car_loc)
 
         parking_space_js = channel[Keys.k_parking_space]
         p0 = Point(parking_space_js[Keys.k_p0][Keys.k_x], parking_space_js[Keys.k_p0][Keys.k_y]) 
@@ -278,13 +466,12 @@ class TrackParser(object):
         p2 = Point(parking_space_js[Keys.k_p2][Keys.k_x], parking_space_js[Keys.k_p2][Keys.k_y]) 
         p3 = Point(parking_space_js[Keys.k_p3][Keys.k_x], parking_space_js[Keys.k_p3][Keys.k_y]) 
         lot = Lot(p0, p1, p2, p3)
-        print(lot)
+        logger.debug("parking space: %s", lot)
 
         raw_output_messages = channel[Keys.k_out_messages]
         raw_output_message = raw_output_messages[0]
 
-        output_messages = raw_output_message.split("<br/>")
-        omsg_parser = OutMessageParser(output_messages)
+        omsg_parser = OutMessageParser(raw_output_message)
         actual_msg, expect_msg = omsg_parser.parse()
         # Adjust the expect_msg to be a list
         if  not isinstance(expect_msg, list):
@@ -325,31 +512,49 @@ class TrackParser(object):
         return TrajectResult(True, case_info, trjactory)
     
 class PosePrint(object):
-    def __init__(self, _result_file, _image_path):
+    def __init__(self, _result_file, _image_path, _profile_dir=None):
         self.result_file = _result_file
         self.image_path = _image_path
+        # Where to dump the cProfile and tracemalloc results, None not to profile
+        self.profile_dir = _profile_dir
+        self.timer = StageTimer()
 
     def print_poses(self):
-        with open(self.result_file) as result_f:
-            result_js = json.load(result_f)
-            test_cases = result_js[Keys.k_test_cases]
-            for test_case in test_cases:
-                tp = TrackParser(test_case)
-                t_res = tp.parse_test_case()
-                if t_res.result is True:
-                    rp = RoadPrinter(t_res.case_info, t_res.trajectory, self.image_path)
-                    rp.plot_pictures()
+        with profile(self.profile_dir, "pose_pic_gen"):
+            with self.timer.stage("print_poses"):
+                self.print_cases()
+        self.timer.log_summary("Timings of %s" % self.result_file)
+
+    def print_cases(self):
+        reader = ResultReader(self.result_file)
+        for test_case in reader.iter_test_cases():
+            self.timer.count("cases")
+            case_times = dict()
+            begin = time.time()
+            t_res = TrackParser(test_case).parse_test_case()
+            case_times["parse"] = time.time() - begin
+            if t_res.result is True:
+                begin = time.time()
+                rp = RoadPrinter(t_res.case_info, t_res.trajectory, self.image_path)
+                self.timer.count("images", len(rp.plot_pictures()))
+                case_times["plot"] = time.time() - begin
+                self.timer.count("plotted_cases")
+            self.timer.add_case(test_case[Keys.k_descriptions].get(Keys.k_description, ""), case_times)
 
 if __name__ == '__main__':
-    if len(sys.argv) != 3:
-        print("Usage: python pose_pic_gen.py {result_json_path} {image_out_path}")
-        print("Example:  python pose_pic_gen.py ./result.json ./images")
-        exit(-1)
-
-    result_js_path = sys.argv[1]
-    image_path = sys.argv[2]
-    if not os.path.exists(image_path):
-        os.makedirs(image_path)
-
-    p = PosePrint(result_js_path, image_path)
-    p.print_poses()    
\ No newline at end of file
+    parser = argparse.ArgumentParser(
+        usage="python pose_pic_gen.py {result_json_path} {image_out_path} [options]",
+        epilog="Example: python pose_pic_gen.py ./result.json ./images --profile ./profile")
+    parser.add_argument("result_js_path")
+    parser.add_argument("image_path")
+    parser.add_argument("--profile", metavar="DIR",
+        help="save cProfile and tracemalloc results of the run to this dir")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="DEBUG also logs every plotting step, the stage timings are logged at INFO")
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    if not os.path.exists(args.image_path):
+        os.makedirs(args.image_path)
+    p = PosePrint(args.result_js_path, args.image_path, args.profile)
+    p.print_poses()
@@ -0,0 +1,31 @@
+import os
+from jinja2 import FileSystemLoader, Environment, FileSystemBytecodeCache
+
+# Shared environments, one per template dir and bytecode cache dir
+environments = dict()
+
+
+def get_environment(tpl_path, bytecode_cache_dir=None):
+    """
+    Return the shared Jinja environment of a template dir. Compiled templates are kept
+    in memory for the whole process and their bytecode is cached on disk (in the system
+    temp dir by default), so a template is compiled once for all the reports rendered
+    """
+    key = (os.path.abspath(tpl_path), bytecode_cache_dir)
+    env = environments.get(key)
+    if env is None:
+        if bytecode_cache_dir is None:
+            bytecode_cache = FileSystemBytecodeCache()
+        else:
+            if not os.path.exists(bytecode_cache_dir):
+                os.makedirs(bytecode_cache_dir)
+            bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+        env = Environment(
+            loader = FileSystemLoader(tpl_path),
+            bytecode_cache = bytecode_cache,
+            # Keep every template and don't stat the template files again
+            cache_size = -1,
+            auto_reload = False
+        )
+        environments[key] = env
+    return env
@@ -1,8 +1,20 @@
+import io
+import os
+import sys
 import json
+import time
 import shutil
-from collections import OrderedDict
-from jinja2 import FileSystemLoader, Environment
-from pose_pic_gen import *
+import argparse
+import multiprocessing
+from collections import OrderedDict, namedtuple
+from render_env import get_environment
+import json_backend
+from result_reader import ResultReader
+from asset_store import AssetStore, ASSET_MODES
+from case_index import CaseIndex, CASE_INDEX_SCRIPT
+from report_manifest import ReportManifest, CaseKeys, detail_name, hash_case, hash_templates
+from report_keys import Keys, Consts, IMAGE_FORMATS, METRIC_NAMES, thumbnail_path, metric_deviation
+from stage_timer import StageTimer, profile, configure_logging
 
 class JsonConvertor(object):  
     def make_new_key(self, old_key):
@@ -14,38 +26,228 @@ class JsonConvertor(object):
         new_key = new_key.lower()
         return new_key[:-1]
 
+    def add_case_show_descriptions(self, test_case):
+        test_case["show_descriptions"] = dict()
+        descriptions = test_case[Keys.k_descriptions]
+        for key, val in descriptions.items():
+            new_key = self.make_new_key(key)
+            test_case["show_descriptions"][new_key] = val
+        return test_case
+
     def add_show_descriptions(self, old_json):
         test_cases = old_json[Keys.k_test_cases]
         for test_case in test_cases:
-            test_case["show_descriptions"] = dict()
-            descriptions = test_case[Keys.k_descriptions]
-            for key, val in descriptions.items():
-                new_key = self.make_new_key(key)
-                test_case["show_descriptions"][new_key] = val
+            self.add_case_show_descriptions(test_case)
         return old_json
-        
+
+
+# Parse, plot and measure a single failed case, top level so it can be pickled
+# and run inside a worker process of ReportGen's pool. The time of every step
+# is returned with the result since the worker has no access to the StageTimer.
+# numpy and matplotlib are imported by the first case plotted, not with this module
+def plot_failed_case(task):
+    from pose_pic_gen import TrackParser, RoadPrinter
+    from track_metrics import trajectory_metrics
+    index, failed_case, image_path, image_cache, printer_options = task
+    case_times = OrderedDict()
+    begin = time.time()
+    tp = TrackParser(failed_case)
+    t_res = tp.parse_test_case()
+    case_times["parse"] = time.time() - begin
+    if t_res.result is not True:
+        return index, None, None, case_times
+    begin = time.time()
+    metrics = trajectory_metrics(t_res.trajectory)
+    case_times["metrics"] = time.time() - begin
+    begin = time.time()
+    rp = RoadPrinter(t_res.case_info, t_res.trajectory, image_path)
+    for name, value in printer_options.items():
+        setattr(rp, name, value)
+    if image_cache is not None:
+        image_paths = image_cache.plot_pictures(rp)
+    else:
+        image_paths = rp.plot_pictures()
+    case_times["plot"] = time.time() - begin
+    return index, image_paths, metrics, case_times
+
+
+# Template chunks grouped per write, and the size of the report file buffer
+RENDER_BUFFER_CHUNKS = 64
+WRITE_BUFFER_SIZE = 1 << 20
+
+ReportSpec = namedtuple("ReportSpec", ["result_file", "report_path", "report_name", "module_name"])
+
+
+class StreamedCases(object):
+    """
+    The passed or failed test cases of a result file for the streamed report,
+    every iteration reads the result file again and only keeps a small window
+    of test cases alive, failed planning cases get their pictures on the way
+    """
+    def __init__(self, _report_gen, _reader, _passed):
+        self.report_gen = _report_gen
+        self.reader = _reader
+        self.passed = _passed
+
+    def __iter__(self):
+        rg = self.report_gen
+        json_conv = JsonConvertor()
+        plot_images = not self.passed and rg.module_name == "planning"
+        window_size = rg.jobs * 4 if plot_images else 1
+        pool = rg.make_pool(window_size) if plot_images else None
+        try:
+            window = list()
+            # Every case has a key, the passed ones too, so they're numbered like in load_result
+            case_keys = CaseKeys()
+            for index, test_case in enumerate(self.reader.iter_test_cases()):
+                case_key = case_keys.key(test_case)
+                if bool(test_case[Keys.k_case_pass]) != self.passed:
+                    continue
+                rg.add_content_hash(test_case)
+                test_case["index"] = index
+                test_case["case_key"] = case_key
+                window.append(json_conv.add_case_show_descriptions(test_case))
+                if len(window) < window_size:
+                    continue
+                if plot_images:
+                    rg.plot_failed_cases(window, pool)
+                for test_case in window:
+                    yield test_case
+                window = list()
+            if plot_images:
+                rg.plot_failed_cases(window, pool)
+            for test_case in window:
+                yield test_case
+        finally:
+            rg.release_pool(pool)
+
 
 class ReportGen(object):
-    def __init__(self, result_file, tpl_path, report_path, report_name, module_name):
+    def __init__(self, result_file, tpl_path, report_path, report_name, module_name, jobs=1, image_cache=None, \
+        bytecode_cache_dir=None, echo=False, lazy_cases=False, incremental=False, sort_failed_by=None, \
+        profile_dir=None, simplify_tolerance=None, image_format="png", combined_images=False, thumbnail_size=None, \
+        asset_store=None, pool=None):
         self.result_file = result_file
         self.tpl_path = tpl_path
         self.report_path = report_path
         self.report_name = report_name
         self.module_name = module_name
+        # Number of worker processes for image generation, 0 means one per CPU
+        self.jobs = jobs if jobs > 0 else multiprocessing.cpu_count()
+        # A long lived worker pool plotting for many reports, instead of a new pool per report
+        self.shared_pool = pool
+        # An ImageCache to skip plotting the unchanged trajectories, None to always plot
+        self.image_cache = image_cache
+        # Where the compiled templates are cached, None for the system temp dir
+        self.bytecode_cache_dir = bytecode_cache_dir
+        # Print the whole report to stdout after writing it
+        self.echo = echo
+        # Write a summary page plus one detail fragment per case, loaded when the case is shown
+        self.lazy_cases = lazy_cases
+        # Reuse the pictures and rendered details of the cases unchanged since the last run
+        self.incremental = incremental
+        # Show the failed cases with the biggest value of this track metric first, None for the result file order
+        self.sort_failed_by = sort_failed_by
+        # Where to dump the cProfile and tracemalloc results of the run, None not to profile
+        self.profile_dir = profile_dir
+        # The RoadPrinter attributes of the failed route pictures: the simplify tolerance in meters
+        # (None to plot every waypoint), the image format, one picture per case or per expect track
+        # and the thumbnail size (None for no thumbnails)
+        self.printer_options = OrderedDict([("simplify_tolerance", simplify_tolerance), \
+            ("image_format", image_format), ("combined", combined_images), ("thumbnail_size", thumbnail_size)])
+        # Puts the css/js into the report dir, a plain copy of the changed files by default
+        self.asset_store = asset_store if asset_store is not None else AssetStore()
+        self.timer = StageTimer()
+        self.manifest = None
+        self.case_index = None
+        self.image_path = os.path.join(report_path, "images")
+        self.template_name = 'index-tpl.html'
 
 
+    def get_template(self):
+        env = get_environment(self.tpl_path, self.bytecode_cache_dir)
+        return env.get_template(self.template_name)
+
+    # Write the report chunk by chunk instead of building the whole page in memory,
+    # the test cases may be lazily streamed
     def render_report(self, dic):
-        loader = FileSystemLoader(self.tpl_path)
-        env = Environment(
-            loader = loader
-        )
+        report_file = os.path.join(self.report_path, "index.htm")
+        inline_css = self.asset_store.inline_css(self.tpl_path)
+        if inline_css is not None:
+            dic["inline_css"] = inline_css
+        with self.timer.stage("render_report"):
+            self.write_template(self.get_template(), report_file, report=dic)
+        if self.echo:
+            with io.open(report_file, encoding="utf-8") as f:
+                shutil.copyfileobj(f, sys.stdout)
+
+    def write_template(self, template, path, **context):
+        stream = template.stream(**context)
+        stream.enable_buffering(RENDER_BUFFER_CHUNKS)
+        with io.open(path, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+            stream.dump(f)
 
-        template = env.get_template('index-tpl.html')
+    # The lazy report fetches the details from cases/, the incremental report keeps them
+    # in a hidden dir to inline them again on the next run
+    def get_details_path(self):
+        if self.lazy_cases:
+            return os.path.join(self.report_path, "cases")
+        return os.path.join(self.report_path, ".incremental")
 
-        list_render_res = template.render(report=dic)
-        with open(self.report_path + "/index.htm", "w") as f:
-            f.write(list_render_res.encode("utf-8"))
-        print(list_render_res)
+    # The lazy report loads cases/{detail_name}.js with a script tag, it works from file:// where
+    # the browsers block fetching cases/{detail_name}.htm. The script fills the card with the fragment
+    def write_case_script(self, test_case, detail_file):
+        script_file = os.path.splitext(detail_file)[0] + ".js"
+        with io.open(detail_file, encoding="utf-8") as f:
+            html = json.dumps(f.read())
+        with io.open(script_file, "w", encoding="utf-8") as f:
+            f.write("fill_case(%s, %s);\n" % (json.dumps("cases/%s.js" % test_case["detail_name"]), html))
+
+    # Render the detail of every test case to a file while the summary page iterates them,
+    # the details of the unchanged cases are kept from the last incremental run
+    def iter_case_details(self, test_cases):
+        env = get_environment(self.tpl_path, self.bytecode_cache_dir)
+        template = env.get_template('case-detail-tpl.html')
+        details_path = self.get_details_path()
+        for test_case in test_cases:
+            # An incremental report names the details after the case key, so an unchanged case
+            # moved by a case added or removed before it is still reused
+            test_case["detail_name"] = str(test_case["index"]) if self.manifest is None \
+                else detail_name(test_case["case_key"])
+            detail_file = os.path.join(details_path, "%s.htm" % test_case["detail_name"])
+            unchanged = self.manifest is not None and self.manifest.unchanged(test_case) is not None
+            script_file = os.path.splitext(detail_file)[0] + ".js"
+            rendered = not unchanged or not os.path.exists(detail_file)
+            if rendered:
+                self.write_template(template, detail_file, test_case=test_case)
+                self.timer.count("rendered_details")
+            if self.lazy_cases and (rendered or not os.path.exists(script_file)):
+                self.write_case_script(test_case, detail_file)
+            if not self.lazy_cases:
+                with io.open(detail_file, encoding="utf-8") as f:
+                    test_case["detail_html"] = f.read()
+            if self.manifest is not None:
+                self.manifest.record(test_case, self.get_saved_images(test_case))
+            yield test_case
+
+    # The report page shows the case details inline, or only the summary for the lazy report.
+    # The case index for the page's search is collected while the page is rendered
+    def add_case_lists(self, json_result, failed_test_cases, passed_test_cases):
+        json_result["lazy_cases"] = self.lazy_cases
+        json_result["case_index"] = CASE_INDEX_SCRIPT
+        if self.lazy_cases or self.manifest is not None:
+            failed_test_cases = self.iter_case_details(failed_test_cases)
+            passed_test_cases = self.iter_case_details(passed_test_cases)
+        self.case_index = CaseIndex()
+        failed_test_cases = self.case_index.collect(failed_test_cases)
+        passed_test_cases = self.case_index.collect(passed_test_cases)
+        json_result["failed_test_cases"] = failed_test_cases
+        json_result["passed_test_cases"] = passed_test_cases
+        return json_result
+
+    def write_case_index(self):
+        with self.timer.stage("write_case_index", len(self.case_index.cases)):
+            self.case_index.write(self.report_path)
 
     # Make the report dir and image dir
     def prepare_dirs(self):
@@ -54,77 +256,311 @@ class ReportGen(object):
         # Make the report dir and image dir
         if not os.path.exists(report_dir):
             os.makedirs(report_dir)
-        image_path = os.path.join(report_dir, "images")
-        if not os.path.exists(image_path):
-            os.makedirs(image_path)
-        
-        css_src_dir = os.path.join(it_tpl_dir, "css")
-        js_src_dir = os.path.join(it_tpl_dir, "js")
-        css_dst_dir = os.path.join(report_dir, "css")
-        js_dst_dir = os.path.join(report_dir, "js")
-        if not os.path.exists(css_dst_dir) or not os.path.exists(js_dst_dir):
-            shutil.copytree(css_src_dir, css_dst_dir)
-            shutil.copytree(js_src_dir, js_dst_dir)
+        if not os.path.exists(self.image_path):
+            os.makedirs(self.image_path)
+        details_path = self.get_details_path()
+        if (self.lazy_cases or self.incremental) and not os.path.exists(details_path):
+            os.makedirs(details_path)
+        # Only the missing or changed css/js files are written
+        with self.timer.stage("sync_assets"):
+            self.timer.count("assets_written", self.asset_store.sync(it_tpl_dir, report_dir))
 
-    def generate(self):
-        with open(self.result_file) as res_f:
-            old_json = json.load(res_f, object_pairs_hook=OrderedDict)
+    def make_pool(self, task_count):
+        if self.shared_pool is not None and task_count > 0:
+            return self.shared_pool
+        if self.jobs > 1 and task_count > 1:
+            return multiprocessing.Pool(min(self.jobs, task_count))
+        return None
+
+    # Close a pool of make_pool, the shared pool is left to its owner
+    def release_pool(self, pool):
+        if pool is not None and pool is not self.shared_pool:
+            pool.close()
+            pool.join()
+
+    # Generate the failed route pictures and save their paths to the TrajectoryFully channel,
+    # a pool is made for this call only if the caller doesn't pass one
+    def plot_failed_cases(self, failed_test_cases, pool=None):
+        with self.timer.stage("plot_failed_cases", len(failed_test_cases)):
+            self.plot_cases(failed_test_cases, pool)
+
+    def plot_cases(self, failed_test_cases, pool):
+        tasks = [(index, failed_case, self.image_path, self.image_cache, self.printer_options) \
+            for index, failed_case in enumerate(failed_test_cases) if not self.reuse_saved_images(failed_case)]
+        self.timer.count("reused_cases", len(failed_test_cases) - len(tasks))
+        own_pool = pool is None
+        if own_pool:
+            pool = self.make_pool(len(tasks))
+        if pool is not None:
+            # imap keeps the results in the same order as the tasks
+            results = pool.imap(plot_failed_case, tasks)
+        else:
+            results = map(plot_failed_case, tasks)
+        try:
+            for index, res_image_paths, metrics, case_times in results:
+                failed_case = failed_test_cases[index]
+                self.timer.add_case(failed_case[Keys.k_descriptions][Keys.k_description], case_times)
+                if res_image_paths is None:
+                    continue
+                self.timer.count("plotted_cases")
+                self.timer.count("images", len(res_image_paths))
+                # Use relative paths for the report pictures
+                res_image_rel_paths = ["./"+raw_path.split(self.report_path)[1] for raw_path in res_image_paths]
+                self.set_saved_images(failed_case, res_image_rel_paths)
+                self.timer.count("image_bytes", sum(os.path.getsize(path) for path in res_image_paths))
+                self.set_metrics(failed_case, metrics)
+        finally:
+            if own_pool:
+                self.release_pool(pool)
+
+    # The thumbnails are named after their pictures, they are set with them
+    def set_saved_images(self, test_case, saved_images):
+        for channel in test_case[Keys.k_channels]:
+            if channel[Keys.k_topic_name] == Consts.TRAJECTORY_TOPIC_NAME:
+                channel[Keys.k_saved_images] = saved_images
+                if self.printer_options["thumbnail_size"] is not None:
+                    channel[Keys.k_saved_thumbnails] = [thumbnail_path(image) for image in saved_images]
+
+    def get_saved_images(self, test_case):
+        for channel in test_case[Keys.k_channels]:
+            if channel[Keys.k_topic_name] == Consts.TRAJECTORY_TOPIC_NAME:
+                return channel.get(Keys.k_saved_images)
+        return None
+
+    def set_metrics(self, test_case, metrics):
+        if metrics is not None:
+            test_case["metrics"] = metrics
+
+    # Failed cases sorted by a track metric, the biggest deviation first and the cases without metrics last
+    def sort_failed_cases(self, failed_test_cases):
+        if self.sort_failed_by is None:
+            return failed_test_cases
+        def sort_key(test_case):
+            value = test_case.get("metrics", {}).get(self.sort_failed_by)
+            if value is None or value != value:
+                return (1, 0)
+            return (0, -metric_deviation(self.sort_failed_by, value))
+        return sorted(failed_test_cases, key=sort_key)
+
+    # Take the pictures of a case unchanged since the last incremental run, if they are still there
+    def reuse_saved_images(self, test_case):
+        if self.manifest is None:
+            return False
+        entry = self.manifest.unchanged(test_case)
+        if entry is None:
+            return False
+        saved_images = entry["saved_images"]
+        if saved_images is None:
+            return True
+        for rel_path in saved_images:
+            if not os.path.exists(os.path.join(self.report_path, rel_path)):
+                return False
+            thumb_path = os.path.join(self.report_path, thumbnail_path(rel_path))
+            if self.printer_options["thumbnail_size"] is not None and not os.path.exists(thumb_path):
+                return False
+        self.set_saved_images(test_case, saved_images)
+        self.set_metrics(test_case, entry.get("metrics"))
+        return True
+
+    def open_manifest(self):
+        if self.incremental:
+            settings = [hash_templates(self.tpl_path), self.report_name, self.module_name, self.lazy_cases, \
+                list(self.printer_options.values())]
+            self.manifest = ReportManifest(self.report_path, settings)
+
+    def save_manifest(self):
+        if self.manifest is not None:
+            self.manifest.save()
+
+    def add_content_hash(self, test_case):
+        if self.manifest is not None:
+            test_case["content_hash"] = hash_case(test_case)
+
+    def evict_image_cache(self):
+        if self.image_cache is not None:
+            with self.timer.stage("evict_image_cache"):
+                self.image_cache.evict()
+
+    def add_report_summary(self, json_result):
+        # Make the test report title
+        final_report_name = "Integration Test Report for %s" % (self.report_name)
+        json_result["report_name"] = final_report_name
+        # Make passed rate shows more friendly, 2 float points
+        pass_rate = json_result["pass_rate"]
+        json_result["pass_rate"] = round(pass_rate, 2) 
+        return json_result
+
+    # Load the result file and prepare it for the report: descriptions, summary,
+    # passed and failed cases split, and the failed route pictures for planning
+    def load_result(self):
+        with self.timer.stage("json_load"):
+            old_json = json_backend.load(self.result_file)
+        self.timer.count("cases", len(old_json[Keys.k_test_cases]))
+        with self.timer.stage("json_convert", len(old_json[Keys.k_test_cases])):
+            # Hash the cases as they are in the result file, before adding the report fields
+            for test_case in old_json[Keys.k_test_cases]:
+                self.add_content_hash(test_case)
             json_conv = JsonConvertor()
             # Add a show_descriptions field for displaying
             json_result = json_conv.add_show_descriptions(old_json)
-            # Make the test report title
-            final_report_name = "Integration Test Report for %s" % (self.report_name)
-            json_result["report_name"] = final_report_name
-            # Make passed rate shows more friendly, 2 float points
-            pass_rate = json_result["pass_rate"]
-            json_result["pass_rate"] = round(pass_rate, 2) 
-
-            # Split passed and failed cases to two part
-            json_result["failed_test_cases"] = list()
-            json_result["passed_test_cases"] = list()
-
-            all_test_cases = json_result[Keys.k_test_cases]
-            for index, test_case in enumerate(all_test_cases):
-                test_case["index"] = index
-                is_pass = test_case[Keys.k_case_pass]
-                if is_pass:
-                    json_result["passed_test_cases"].append(test_case)
-                else:
-                    json_result["failed_test_cases"].append(test_case)
-            
-            if self.module_name == "planning":
-                # If this is the planning module, generate failed route pictures
-                failed_test_cases = json_result["failed_test_cases"]
-                image_path = os.path.join(self.report_path, "images")
-                for failed_case in failed_test_cases:
-                    tp = TrackParser(failed_case)
-                    t_res = tp.parse_test_case()
-                    if t_res.result is True:
-                        rp = RoadPrinter(t_res.case_info, t_res.trajectory, image_path)
-                        res_image_paths = rp.plot_pictures()
-                        # Use relative paths for the report pictures
-                        res_image_rel_paths = ["./"+raw_path.split(self.report_path)[1] for raw_path in res_image_paths]
-                        channels = failed_case[Keys.k_channels]
-                        for channel in channels:
-                            if channel[Keys.k_topic_name] == 'TrajectoryFully':
-                                channel[Keys.k_saved_images] = res_image_rel_paths
+            json_result = self.add_report_summary(json_result)
+
+        # Split passed and failed cases to two part
+        json_result["failed_test_cases"] = list()
+        json_result["passed_test_cases"] = list()
+
+        all_test_cases = json_result[Keys.k_test_cases]
+        case_keys = CaseKeys()
+        for index, test_case in enumerate(all_test_cases):
+            test_case["index"] = index
+            test_case["case_key"] = case_keys.key(test_case)
+            is_pass = test_case[Keys.k_case_pass]
+            if is_pass:
+                json_result["passed_test_cases"].append(test_case)
+            else:
+                json_result["failed_test_cases"].append(test_case)
+        
+        if self.module_name == "planning":
+            # If this is the planning module, generate failed route pictures
+            self.plot_failed_cases(json_result["failed_test_cases"])
+            self.evict_image_cache()
+            json_result["failed_test_cases"] = self.sort_failed_cases(json_result["failed_test_cases"])
+        return json_result
+
+    def generate(self):
+        with profile(self.profile_dir, self.profile_name()):
+            self.open_manifest()
+            json_result = self.load_result()
+            json_result = self.add_case_lists(json_result, json_result["failed_test_cases"], \
+                json_result["passed_test_cases"])
             self.render_report(json_result)
-            
+            self.write_case_index()
+            self.save_manifest()
+        self.timer.log_summary("Timings of %s" % self.report_path)
 
-if __name__ == '__main__':
-  
-    if len(sys.argv) < 6:
-        print("Usage: python report_gen.py {result_json_path} {it_template_dir} {report_dir} {Report_name} {module_name}")
-        print("Example: python report_gen.py ./result.json ./it_template ./report 'Planning BVT' planning")
-        exit(-1)
-    
-    result_js_path = sys.argv[1]
-    it_tpl_dir = sys.argv[2]
-    report_dir = sys.argv[3]
-    report_name = sys.argv[4]
-    module_name = sys.argv[5]
-
-    rg = ReportGen(result_js_path, it_tpl_dir, report_dir, report_name, module_name)
+    # Same report as generate, but the result file is read incrementally so the peak
+    # memory is bounded by the biggest test case instead of the whole run
+    def generate_streaming(self):
+        if self.sort_failed_by is not None:
+            raise ValueError("The streamed report keeps the result file order, it can't sort the failed cases")
+        with profile(self.profile_dir, self.profile_name()):
+            self.open_manifest()
+            reader = ResultReader(self.result_file)
+            json_result = self.add_report_summary(reader.read_header())
+            json_result = self.add_case_lists(json_result, StreamedCases(self, reader, False), \
+                StreamedCases(self, reader, True))
+            # The result file is read, and the failed cases plotted, while the report is rendered
+            self.render_report(json_result)
+            self.write_case_index()
+            if self.module_name == "planning":
+                self.evict_image_cache()
+            self.save_manifest()
+        self.timer.log_summary("Timings of %s" % self.report_path)
+
+    # The profile files are named after the report dir, so the reports of a batch don't overwrite each other
+    def profile_name(self):
+        return os.path.basename(os.path.normpath(self.report_path)) or "report"
+
+
+def generate_report(spec, tpl_path, stream=False, **options):
+    rg = ReportGen(spec.result_file, tpl_path, spec.report_path, spec.report_name, spec.module_name, **options)
     rg.prepare_dirs()
-    rg.generate()
+    if stream:
+        rg.generate_streaming()
+    else:
+        rg.generate()
+    return rg
+
+
+# Render many result files in this process, the shared environment compiles the template only once
+def generate_reports(report_specs, tpl_path, stream=False, **options):
+    return [generate_report(spec, tpl_path, stream, **options) for spec in report_specs]
+
+
+# The options of every report CLI, the single, batch and merged reports and the service
+def add_shared_arguments(parser):
+    parser.add_argument("--image-cache", metavar="DIR",
+        help="reuse the pictures of unchanged failed trajectories from this cache dir")
+    parser.add_argument("--image-cache-size", type=int, default=512, metavar="MB",
+        help="evict the least recently used pictures when the image cache is bigger than this")
+    parser.add_argument("--bytecode-cache", metavar="DIR",
+        help="dir of the compiled template cache, the system temp dir by default")
+    parser.add_argument("--lazy-cases", action="store_true",
+        help="write a summary page and one detail fragment per case, fetched when the case is expanded")
+    parser.add_argument("--json-backend", default="auto", choices=["auto"] + json_backend.BACKEND_NAMES,
+        help="module decoding the result file, auto takes the fastest one installed")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="DEBUG also logs every plotting step, the stage timings are logged at INFO")
+
+
+def add_generate_arguments(parser):
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+        help="worker processes used to plot failed trajectories, 0 means one per CPU")
+    parser.add_argument("--stream", action="store_true",
+        help="read the result file one test case at a time to bound the memory usage")
+    add_shared_arguments(parser)
+    parser.add_argument("--echo", action="store_true",
+        help="print the whole report to stdout after writing it")
+    parser.add_argument("--incremental", action="store_true",
+        help="only plot and render again the cases whose JSON changed since the last run in the report dir")
+    parser.add_argument("--simplify-tolerance", type=float, metavar="METERS",
+        help="drop the plotted waypoints closer than this to the simplified track, for very long tracks")
+    parser.add_argument("--image-format", default="png", choices=sorted(IMAGE_FORMATS),
+        help="format of the failed route pictures, png-compressed and webp are several times smaller")
+    parser.add_argument("--combined-images", action="store_true",
+        help="draw all the expect tracks of a case in one picture instead of one picture per track")
+    parser.add_argument("--thumbnails", type=int, metavar="PIXELS",
+        help="show thumbnails this big in the report, linking to the full size pictures")
+    parser.add_argument("--asset-mode", default="copy", choices=ASSET_MODES,
+        help="how the css/js get into the report: copied, linked from --asset-store, or the css inlined in the page")
+    parser.add_argument("--asset-store", metavar="DIR",
+        help="shared store of the css/js by content hash, needed by the hardlink and symlink asset modes")
+    parser.add_argument("--profile", metavar="DIR",
+        help="save cProfile and tracemalloc results of the report process to this dir")
+    parser.add_argument("--sort-failed-by", choices=METRIC_NAMES,
+        help="show the failed planning cases with the biggest value of this track metric first (the biggest "
+        "difference for turn_count_diff), not with --stream")
+
+
+# Refuse the add_generate_arguments options that don't go together, before any report dir is made
+def check_generate_arguments(parser, args):
+    if args.stream and args.sort_failed_by:
+        parser.error("--stream keeps the result file order, it can't be used with --sort-failed-by")
+
+
+# The keyword arguments of the parsed add_shared_arguments options, selects the JSON backend
+def make_shared_options(args):
+    json_backend.use_backend(args.json_backend)
+    image_cache = None
+    if args.image_cache:
+        from image_cache import ImageCache
+        image_cache = ImageCache(args.image_cache, args.image_cache_size * 1024 * 1024)
+    return dict(image_cache=image_cache, bytecode_cache_dir=args.bytecode_cache, lazy_cases=args.lazy_cases)
+
+
+# The ReportGen keyword arguments of the parsed add_generate_arguments options
+def make_generate_options(args):
+    options = make_shared_options(args)
+    options.update(jobs=args.jobs, echo=args.echo, incremental=args.incremental, sort_failed_by=args.sort_failed_by, \
+        profile_dir=args.profile, simplify_tolerance=args.simplify_tolerance, image_format=args.image_format, \
+        combined_images=args.combined_images, thumbnail_size=args.thumbnails, \
+        asset_store=AssetStore(args.asset_store, args.asset_mode))
+    return options
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        usage="python report_gen.py {result_json_path} {it_template_dir} {report_dir} {Report_name} {module_name} [options]",
+        epilog="Example: python report_gen.py ./result.json ./it_template ./report 'Planning BVT' planning --jobs 4")
+    parser.add_argument("result_js_path")
+    parser.add_argument("it_tpl_dir")
+    parser.add_argument("report_dir")
+    parser.add_argument("report_name")
+    parser.add_argument("module_name")
+    add_generate_arguments(parser)
+    args = parser.parse_args()
+    check_generate_arguments(parser, args)
+    configure_logging(args.log_level)
 
+    spec = ReportSpec(args.result_js_path, args.report_dir, args.report_name, args.module_name)
+    generate_report(spec, args.it_tpl_dir, args.stream, **make_generate_options(args))
@@ -0,0 +1,65 @@
+import os
+
+# The names shared by the report and the plotting code. This module must stay free of
+# numpy, matplotlib and PIL: the report of a module that plots nothing only imports it
+
+
+class Keys(object):
+    k_test_cases = "test_cases"
+    k_descriptions = "descriptions"
+    k_description = "Description"
+    k_case_id = "Test Case ID"
+    k_case_pass = "pass"
+    k_channels = "channels"
+    k_topic_name = "topic_name"
+    k_failed_reason = "plan_failed_reasons"
+    k_car_loc = "car_loc"
+    k_x = "x"
+    k_y = "y"
+    k_theta = "theta"
+    k_parking_space = "parking_space"
+    k_p0 = "p0"
+    k_p1 = "p1"
+    k_p2 = "p2"
+    k_p3 = "p3"
+    k_out_messages = "output_messages"
+    k_waypoints = "waypoints"
+    k_direction = "direction"
+    k_speed = "speed"
+    k_pose = "pose"
+    k_saved_images = "saved_images"
+    k_saved_thumbnails = "saved_thumbnails"
+
+
+class Consts(object):
+    TRAJECTORY_TOPIC_NAME = "TrajectoryFully"
+    FullFailReasonColl = ["TypeValidationFailure",
+                            "StartEndDistanceFailure",
+                            "TurnCountDiffFailure",
+                            "TurnCurveRateFailure"]
+
+METRIC_NAMES = ["dtw", "frechet", "endpoint_error", "heading_error", "turn_count_diff"]
+# Metrics with a sign, actual - expect, the cases are sorted by how far they are from 0
+SIGNED_METRICS = ["turn_count_diff"]
+
+
+# How bad a metric value is, the bigger the worse
+def metric_deviation(name, value):
+    return abs(value) if name in SIGNED_METRICS else value
+
+# The file extension and savefig options of the image formats, png-compressed is a
+# palette PNG, the plots have few colors so it's much smaller than the RGBA one
+IMAGE_FORMATS = {
+    "png": ("png", {}),
+    "png-compressed": ("png", None),
+    "webp": ("webp", {"pil_kwargs": {"quality": 80, "method": 4}}),
+    "svg": ("svg", {}),
+}
+
+
+# The thumbnail of a picture, a PNG next to it for the vector formats
+def thumbnail_path(image_path):
+    root, ext = os.path.splitext(image_path)
+    if ext == ".svg":
+        ext = ".png"
+    return "%s.thumb%s" % (root, ext)
@@ -0,0 +1,89 @@
+import os
+import io
+import json
+import hashlib
+from report_keys import Keys
+
+MANIFEST_VERSION = 3
+MANIFEST_NAME = ".report_manifest.json"
+
+
+def hash_case(test_case):
+    text = json.dumps(test_case, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def hash_templates(tpl_path):
+    h = hashlib.sha1()
+    for name in sorted(os.listdir(tpl_path)):
+        path = os.path.join(tpl_path, name)
+        if os.path.isfile(path):
+            h.update(name.encode("utf-8"))
+            with open(path, "rb") as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+class CaseKeys(object):
+    """
+    The manifest key of every case of a result file: its Test Case ID, numbered when the id
+    is repeated. Unlike the position, the key of a case doesn't change when a case is
+    added or removed before it. The keys must be taken in the result file order
+    """
+    def __init__(self):
+        self.seen = dict()
+
+    def key(self, test_case):
+        case_id = str(test_case[Keys.k_descriptions].get(Keys.k_case_id, ""))
+        occurrence = self.seen.get(case_id, 0)
+        self.seen[case_id] = occurrence + 1
+        return "%s#%d" % (case_id, occurrence)
+
+
+# The file name of the rendered detail of a case, after its key so it's reused wherever the case moves
+def detail_name(case_key):
+    return hashlib.sha1(case_key.encode("utf-8")).hexdigest()[:16]
+
+
+class ReportManifest(object):
+    """
+    What the previous run of a report dir produced: a content hash, the saved images and metrics
+    of every test case by its CaseKeys key, plus a hash of the settings the report was made with.
+    A case is unchanged when its JSON hashes the same as last time under the same settings,
+    then its pictures, track metrics and rendered details are reused instead of being made again
+    """
+    def __init__(self, _report_path, _settings):
+        self.manifest_file = os.path.join(_report_path, MANIFEST_NAME)
+        self.settings = _settings
+        self.old_cases = dict()
+        self.cases = dict()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.manifest_file):
+            return
+        try:
+            with io.open(self.manifest_file, encoding="utf-8") as f:
+                manifest_js = json.load(f)
+        except ValueError:
+            return
+        if manifest_js.get("version") == MANIFEST_VERSION and manifest_js.get("settings") == self.settings:
+            self.old_cases = manifest_js["cases"]
+
+    # The previous entry of an unchanged test case, None if it's new or changed
+    def unchanged(self, test_case):
+        entry = self.old_cases.get(test_case["case_key"])
+        if entry is not None and entry["hash"] == test_case["content_hash"]:
+            return entry
+        return None
+
+    def record(self, test_case, saved_images):
+        self.cases[test_case["case_key"]] = {"hash": test_case["content_hash"], "saved_images": saved_images, \
+            "metrics": test_case.get("metrics")}
+
+    def save(self):
+        manifest_js = {"version": MANIFEST_VERSION, "settings": self.settings, "cases": self.cases}
+        tmp_file = self.manifest_file + ".tmp"
+        with io.open(tmp_file, "w", encoding="utf-8") as f:
+            f.write(json.dumps(manifest_js, indent=1, sort_keys=True))
+        os.replace(tmp_file, self.manifest_file)
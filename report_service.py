@@ -0,0 +1,261 @@
+import io
+import json
+import time
+import queue
+import logging
+import argparse
+import itertools
+import threading
+import multiprocessing
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import pose_pic_gen
+from render_env import get_environment
+from report_gen import ReportSpec, generate_report, add_generate_arguments, \
+    check_generate_arguments, make_generate_options
+from stage_timer import configure_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 16
+# Finished jobs kept for GET /reports/<id>, the oldest are forgotten first
+KEPT_JOBS = 1000
+WARM_TEMPLATES = ["index-tpl.html", "case-detail-tpl.html", "merged-index-tpl.html"]
+
+
+class ReportJob(object):
+    def __init__(self, _job_id, _spec, _stream):
+        self.job_id = _job_id
+        self.spec = _spec
+        self.stream = _stream
+        self.status = "queued"
+        self.error = None
+        self.queued_at = time.time()
+        self.seconds = None
+        self.counters = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        return OrderedDict([("id", self.job_id), ("status", self.status), ("report_dir", self.spec.report_path), \
+            ("seconds", self.seconds), ("counters", self.counters), ("error", self.error)])
+
+
+class ReportService(object):
+    """
+    Renders reports in a long running process, so a report doesn't pay for importing
+    matplotlib, compiling the templates, loading the fonts or forking the plotting pool.
+    Jobs wait in a bounded queue for one of the worker threads, a full queue is refused
+    instead of piling up. The ReportGen options are shared by every job, the image cache
+    and asset store included. matplotlib can't draw in several threads at once, so with
+    more than one worker thread the pictures are always plotted in the process pool, and
+    with --profile the reports take turns
+    """
+    def __init__(self, _tpl_path, _options, _workers=DEFAULT_WORKERS, _queue_size=DEFAULT_QUEUE_SIZE, \
+        _stream=False):
+        if _stream and _options.get("sort_failed_by"):
+            raise ValueError("The streamed reports keep the result file order, they can't sort the failed cases")
+        self.tpl_path = _tpl_path
+        self.options = dict(_options)
+        # Whether the reports are streamed when the request doesn't say
+        self.stream = _stream
+        self.workers = _workers
+        self.pool = None
+        self.queue = queue.Queue(_queue_size)
+        self.jobs = OrderedDict()
+        self.jobs_lock = threading.Lock()
+        self.job_ids = itertools.count(1)
+        self.threads = list()
+        # The templates may be edited while the service runs, check them before every render,
+        # or the reports would be rendered with the old templates under the new templates hash
+        get_environment(self.tpl_path, self.options.get("bytecode_cache_dir")).auto_reload = True
+
+    # Compile the templates and draw a figure once, the first report is then as fast as the next ones
+    def warm_up(self):
+        begin = time.time()
+        env = get_environment(self.tpl_path, self.options.get("bytecode_cache_dir"))
+        for name in WARM_TEMPLATES:
+            env.get_template(name)
+        pose_pic_gen.import_plotting()
+        figure = pose_pic_gen.Figure(figsize=(1, 1))
+        pose_pic_gen.FigureCanvasAgg(figure)
+        figure.add_subplot(1, 1, 1).set_title("warm up")
+        figure.savefig(io.BytesIO(), format="png")
+        logger.info("Warmed up in %.3f s", time.time() - begin)
+
+    # Fork the plotting pool once, after the warm up and before any thread is started
+    def start(self):
+        jobs = self.options.get("jobs", 1)
+        jobs = jobs if jobs > 0 else multiprocessing.cpu_count()
+        if jobs > 1 or self.workers > 1:
+            self.pool = self.options["pool"] = multiprocessing.Pool(jobs)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.work, name="report-worker-%d" % i, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = list()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = self.options["pool"] = None
+
+    # Queue a report, raises queue.Full when the queue is full. A None stream is the service default,
+    # a streamed report is refused with ValueError when the failed cases are sorted
+    def submit(self, spec, stream=None):
+        stream = self.stream if stream is None else stream
+        if stream and self.options.get("sort_failed_by"):
+            raise ValueError("A streamed report can't sort the failed cases")
+        job = ReportJob(next(self.job_ids), spec, stream)
+        self.queue.put_nowait(job)
+        with self.jobs_lock:
+            self.jobs[job.job_id] = job
+            while len(self.jobs) > KEPT_JOBS:
+                oldest = next(iter(self.jobs.values()))
+                if not oldest.done.is_set():
+                    break
+                self.jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id):
+        with self.jobs_lock:
+            return self.jobs.get(job_id)
+
+    def work(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:
+                    return
+                self.run_job(job)
+            finally:
+                self.queue.task_done()
+
+    def run_job(self, job):
+        job.status = "running"
+        begin = time.time()
+        try:
+            rg = generate_report(job.spec, self.tpl_path, job.stream, **self.options)
+            job.counters = dict(rg.timer.counters)
+            job.status = "done"
+        except Exception as e:
+            logger.exception("Report %s failed", job.spec.report_path)
+            job.error = "%s: %s" % (type(e).__name__, e)
+            job.status = "failed"
+        job.seconds = round(time.time() - begin, 3)
+        logger.info("Report %s %s in %.3f s, waited %.3f s", job.spec.report_path, job.status, job.seconds, \
+            begin - job.queued_at)
+        job.done.set()
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /reports with {"result_file", "report_dir", "report_name", "module_name"[, "stream"]}
+    queues a report, streamed as with --stream unless "stream" says otherwise, add ?wait=1 to answer when it's written. GET /reports/<id> is the state
+    of a job and GET /health the queue length
+    """
+    def send_json(self, code, js):
+        body = json.dumps(js).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if code == 503:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        service = self.server.service
+        path = urlparse(self.path).path.rstrip("/")
+        if path == "/health":
+            self.send_json(200, {"queued": service.queue.qsize(), "workers": len(service.threads)})
+            return
+        parts = path.split("/")
+        if len(parts) == 3 and parts[1] == "reports" and parts[2].isdigit():
+            job = service.get(int(parts[2]))
+            if job is not None:
+                self.send_json(200, job.to_dict())
+                return
+        self.send_json(404, {"error": "Not found: %s" % path})
+
+    def do_POST(self):
+        service = self.server.service
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/reports":
+            self.send_json(404, {"error": "Not found: %s" % url.path})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            spec_js = json.loads(self.rfile.read(length).decode("utf-8"))
+            spec = ReportSpec(spec_js["result_file"], spec_js["report_dir"], spec_js["report_name"], \
+                spec_js["module_name"])
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(400, {"error": "Bad report request: %s" % e})
+            return
+        try:
+            stream = spec_js.get("stream")
+            job = service.submit(spec, None if stream is None else bool(stream))
+        except queue.Full:
+            self.send_json(503, {"error": "The report queue is full"})
+            return
+        except ValueError as e:
+            self.send_json(400, {"error": "Bad report request: %s" % e})
+            return
+        if parse_qs(url.query).get("wait", ["0"])[0] not in ("", "0"):
+            job.done.wait()
+            self.send_json(200 if job.status == "done" else 500, job.to_dict())
+        else:
+            self.send_json(202, job.to_dict())
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), ReportRequestHandler)
+    server.service = service
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        usage="python report_service.py {it_template_dir} [options]",
+        description="Serve report requests on a local HTTP port, with the templates, matplotlib, "
+            "the image cache and the plotting pool kept warm between the reports",
+        epilog="Example: python report_service.py ./it_template --jobs 4 --image-cache ./cache, then "
+            "curl -d '{\"result_file\": \"./result.json\", \"report_dir\": \"./report\", "
+            "\"report_name\": \"Planning BVT\", \"module_name\": \"planning\"}' 'http://127.0.0.1:8765/reports?wait=1'")
+    parser.add_argument("it_tpl_dir")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+        help="address to listen on, the local host by default")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+        help="reports rendered at the same time")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+        help="reports waiting for a worker, more requests are refused with 503")
+    add_generate_arguments(parser)
+    args = parser.parse_args()
+    check_generate_arguments(parser, args)
+    configure_logging(args.log_level)
+
+    options = make_generate_options(args)
+    service = ReportService(args.it_tpl_dir, options, args.workers, args.queue_size, args.stream)
+    service.warm_up()
+    service.start()
+    server = make_server(service, args.host, args.port)
+    logger.info("Serving reports on http://%s:%d", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
@@ -0,0 +1,159 @@
+import re
+import json
+from json.decoder import scanstring
+
+CHUNK_SIZE = 1 << 20
+TEST_CASES_KEY = "test_cases"
+
+WHITESPACE = re.compile(r"\s*")
+SCALAR_END = re.compile(r"[\s,\]}]")
+# The start of a string or a bracket, used to skip values without decoding their containers
+SKIP_TOKEN = re.compile(r'["\[\]{}]')
+
+
+class JsonStream(object):
+    """
+    A forward only cursor over a JSON file, it keeps only the not yet consumed
+    part of the file in memory and decodes one value at a time
+    """
+    def __init__(self, _file, _chunk_size=CHUNK_SIZE):
+        self.file = _file
+        self.chunk_size = _chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    # Drop the consumed part and read more, the read size grows with the buffer
+    # so that a big value is decoded after a logarithmic number of retries
+    def fill(self):
+        if self.eof:
+            return False
+        chunk = self.file.read(max(self.chunk_size, len(self.buf) - self.pos))
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        if not chunk:
+            self.eof = True
+        return bool(chunk)
+
+    def peek(self):
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON file")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError("Expecting '%s' at %s, got '%s'" % (char, self.pos, self.buf[self.pos]))
+        self.pos += 1
+
+    def decode_value(self):
+        # Strings and containers are self delimited, but a number at the end of
+        # the buffer may be cut, so read until the delimiter after it is loaded
+        if self.peek() not in '"[{':
+            while SCALAR_END.search(self.buf, self.pos) is None and self.fill():
+                pass
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if not self.fill():
+                    raise
+                continue
+            self.pos = end
+            return value
+
+    def skip_value(self):
+        if self.peek() not in "[{":
+            self.decode_value()
+            return
+        depth = 0
+        while True:
+            match = SKIP_TOKEN.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                if not self.fill():
+                    raise ValueError("Unexpected end of JSON file")
+                continue
+            token = match.group()
+            if token == '"':
+                # The C string scanner finds the closing quote much faster than a regex over the escapes
+                try:
+                    _, self.pos = scanstring(self.buf, match.end())
+                except ValueError:
+                    self.pos = match.start()
+                    if not self.fill():
+                        raise
+                continue
+            self.pos = match.end()
+            if token in "[{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    # Yield the key of every member of the object at the cursor,
+    # the caller has to consume the member value before asking for the next key
+    def iter_members(self):
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.decode_value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def iter_elements(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+
+class ResultReader(object):
+    """
+    Incremental reader of a result.json file, the test cases are yielded one by one
+    so the peak memory is bounded by the biggest test case instead of the whole run
+    """
+    def __init__(self, _result_file, _chunk_size=CHUNK_SIZE):
+        self.result_file = _result_file
+        self.chunk_size = _chunk_size
+
+    # All the top level fields except the test cases, like passed_cases and pass_rate
+    def read_header(self):
+        header = dict()
+        with open(self.result_file) as result_f:
+            stream = JsonStream(result_f, self.chunk_size)
+            for key in stream.iter_members():
+                if key == TEST_CASES_KEY:
+                    stream.skip_value()
+                else:
+                    header[key] = stream.decode_value()
+        return header
+
+    def iter_test_cases(self):
+        with open(self.result_file) as result_f:
+            stream = JsonStream(result_f, self.chunk_size)
+            for key in stream.iter_members():
+                if key != TEST_CASES_KEY:
+                    stream.skip_value()
+                    continue
+                for test_case in stream.iter_elements():
+                    yield test_case
+                return
@@ -0,0 +1,113 @@
+import os
+import time
+import heapq
+import pstats
+import logging
+import cProfile
+import threading
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_CASES = 10
+TRACEMALLOC_TOP = 25
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+# tracemalloc traces the whole process, the profiled runs of the report service threads take turns
+profile_lock = threading.Lock()
+
+
+def configure_logging(level="INFO"):
+    logging.basicConfig(level=getattr(logging, level), format=LOG_FORMAT)
+
+
+class StageTimer(object):
+    """
+    Wall time, calls and items of the report stages, plus counters and the slowest cases.
+    Stages may nest, like plotting inside the streamed rendering. The per-case times come
+    from the plotting workers and are summed, so with many jobs they exceed the wall time
+    """
+    def __init__(self, _slowest_cases=SLOWEST_CASES):
+        self.slowest_cases = _slowest_cases
+        self.stages = OrderedDict()
+        self.counters = OrderedDict()
+        self.case_times = list()
+
+    def add(self, name, seconds, items=0):
+        stage = self.stages.setdefault(name, [0.0, 0, 0])
+        stage[0] += seconds
+        stage[1] += 1
+        stage[2] += items
+
+    @contextmanager
+    def stage(self, name, items=0):
+        begin = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, time.time() - begin, items)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    # Per-case stage times, like {"parse": 0.01, "plot": 0.3}, measured in a worker
+    def add_case(self, label, case_times):
+        for name, seconds in case_times.items():
+            self.add("case_" + name, seconds, 1)
+        entry = (sum(case_times.values()), label)
+        if len(self.case_times) < self.slowest_cases:
+            heapq.heappush(self.case_times, entry)
+        else:
+            heapq.heappushpop(self.case_times, entry)
+
+    def summary(self):
+        lines = ["%-22s %10s %8s %10s" % ("stage", "seconds", "calls", "items")]
+        for name, (seconds, calls, items) in self.stages.items():
+            lines.append("%-22s %10.3f %8d %10d" % (name, seconds, calls, items))
+        for name, value in self.counters.items():
+            lines.append("%-22s %10s %8s %10d" % (name, "", "", value))
+        if self.case_times:
+            lines.append("slowest cases:")
+            for seconds, label in sorted(self.case_times, reverse=True):
+                lines.append("  %10.3f  %s" % (seconds, label))
+        return "\n".join(lines)
+
+    def log_summary(self, title):
+        logger.info("%s\n%s", title, self.summary())
+
+
+@contextmanager
+def profile(profile_dir, name):
+    """
+    cProfile and tracemalloc the body, then dump <name>.prof (for pstats or snakeviz), the top
+    functions to <name>.pstats.txt and the biggest allocation sites to <name>.tracemalloc.txt.
+    Only this process is profiled, not the plotting workers, and only one body at a time.
+    A None profile_dir is a no-op
+    """
+    if profile_dir is None:
+        yield
+        return
+    if not os.path.exists(profile_dir):
+        os.makedirs(profile_dir)
+    with profile_lock:
+        profiler = cProfile.Profile()
+        tracemalloc.start()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    prof_file = os.path.join(profile_dir, "%s.prof" % name)
+    profiler.dump_stats(prof_file)
+    mem_file = os.path.join(profile_dir, "%s.tracemalloc.txt" % name)
+    with open(mem_file, "w") as mem_f:
+        mem_f.write("peak traced memory: %.1f MB\n" % (peak / (1024.0 * 1024.0)))
+        for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+            mem_f.write("%s\n" % stat)
+    with open(os.path.join(profile_dir, "%s.pstats.txt" % name), "w") as stats_f:
+        pstats.Stats(prof_file, stream=stats_f).sort_stats("cumulative").print_stats(30)
+    logger.info("Profile saved to %s and %s", prof_file, mem_file)
@@ -0,0 +1,67 @@
+import os
+import sys
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+tpl_dir = os.path.join(root_dir, "it_template")
+
+from asset_store import AssetStore, iter_asset_files, minify_css
+from report_gen import ReportGen
+
+
+def asset_files(report_dir, asset_dirs=("css", "js")):
+    return [os.path.join(report_dir, rel_path) for _, rel_path in iter_asset_files(tpl_dir, asset_dirs)]
+
+
+def test_sync_fixes_partial_copy(tmp_path):
+    print("sync only the missing or changed assets")
+    report_dir = str(tmp_path / "report")
+    store = AssetStore()
+    files = asset_files(report_dir)
+    assert store.sync(tpl_dir, report_dir) == len(files)
+    assert store.sync(tpl_dir, report_dir) == 0, "Unchanged assets are written again!"
+
+    # A copy interrupted half way: one file missing, one truncated
+    os.remove(files[0])
+    with open(files[-1], "w") as f:
+        f.write("trunc")
+    assert store.sync(tpl_dir, report_dir) == 2
+    for dst in files:
+        assert os.path.exists(dst)
+    assert os.path.getsize(files[-1]) > len("trunc")
+
+
+def test_linked_assets(tmp_path):
+    print("hard link and symlink the assets from a shared store")
+    store_dir = str(tmp_path / "store")
+    for mode in ["hardlink", "symlink"]:
+        store = AssetStore(store_dir, mode)
+        report_dirs = [str(tmp_path / mode / str(i)) for i in range(2)]
+        for report_dir in report_dirs:
+            store.sync(tpl_dir, report_dir)
+        first, second = [asset_files(report_dir) for report_dir in report_dirs]
+        for a, b in zip(first, second):
+            assert os.path.samefile(a, b), "Asset is not shared between the reports!"
+            assert os.path.islink(a) == (mode == "symlink")
+            if mode == "symlink":
+                assert os.path.dirname(os.readlink(a)) == store_dir
+        assert store.sync(tpl_dir, report_dirs[0]) == 0
+    assert len(os.listdir(store_dir)) == len(asset_files(""))
+
+
+def test_inline_css_report(tmp_path):
+    print("inline the minified css into the report page")
+    report_dir = str(tmp_path / "report")
+    assert minify_css("a  > b { color : red ; } /* note */\n.c :hover{}") == "a>b{color : red;}.c :hover{}"
+    rg = ReportGen(result_file, tpl_dir, report_dir, "planning BVT", "planning", \
+        asset_store=AssetStore(None, "inline"))
+    rg.prepare_dirs()
+    rg.generate()
+    with open(os.path.join(report_dir, "index.htm")) as f:
+        page = f.read()
+    assert '<style type="text/css">' in page
+    assert 'href="css/sb-admin-2.min.css"' not in page
+    assert not os.path.exists(os.path.join(report_dir, "css"))
+    for dst in asset_files(report_dir, ["js"]):
+        assert os.path.exists(dst)
@@ -0,0 +1,30 @@
+import os
+import sys
+import json
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+tpl_dir = os.path.join(root_dir, "it_template")
+
+from batch_report_gen import load_report_specs
+from report_gen import generate_reports
+
+
+def test_render_batch(tmp_path):
+    print("render a batch of reports with one template")
+    batch_js = [{"result_file": result_file, "report_dir": str(tmp_path / module), \
+        "report_name": "%s BVT" % module, "module_name": module} for module in ["planning", "perception"]]
+    batch_file = str(tmp_path / "batch.json")
+    with open(batch_file, "w") as batch_f:
+        json.dump(batch_js, batch_f)
+
+    bytecode_dir = str(tmp_path / "bytecode")
+    rgs = generate_reports(load_report_specs(batch_file), tpl_dir, stream=True, bytecode_cache_dir=bytecode_dir)
+    templates = set(id(rg.get_template()) for rg in rgs)
+    assert len(templates) == 1, "Template is compiled for every report!"
+    for spec in batch_js:
+        with open(os.path.join(spec["report_dir"], "index.htm")) as f:
+            assert "Integration Test Report for %s" % spec["report_name"] in f.read()
+    assert len(os.listdir(os.path.join(batch_js[0]["report_dir"], "images"))) == 1
+    assert len(os.listdir(os.path.join(batch_js[1]["report_dir"], "images"))) == 0
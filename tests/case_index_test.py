@@ -0,0 +1,51 @@
+import os
+import sys
+import json
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+tpl_dir = os.path.join(root_dir, "it_template")
+
+from case_index import CASE_FIELDS, CASE_INDEX_JSON, CASE_INDEX_SCRIPT, failed_reasons
+from track_metrics import METRIC_NAMES
+from report_gen import ReportGen
+
+
+def generate(report_dir, stream):
+    rg = ReportGen(result_file, tpl_dir, report_dir, "Planning BVT", "planning")
+    rg.prepare_dirs()
+    if stream:
+        rg.generate_streaming()
+    else:
+        rg.generate()
+    with open(os.path.join(report_dir, CASE_INDEX_JSON), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_case_index(tmp_path):
+    print("write the case index of the report for the page's search")
+    with open(result_file) as f:
+        test_cases = json.load(f)["test_cases"]
+    case_index = generate(str(tmp_path / "report"), False)
+    assert case_index["fields"] == CASE_FIELDS and case_index["metrics"] == METRIC_NAMES
+    rows = [dict(zip(CASE_FIELDS, case)) for case in case_index["cases"]]
+    assert [row["index"] for row in rows] == list(range(len(test_cases)))
+    for row, test_case in zip(rows, test_cases):
+        assert row["description"] == test_case["descriptions"]["Description"]
+        assert row["jira_id"] == test_case["descriptions"]["JIRA ID"]
+        assert row["pass"] == int(test_case["pass"])
+        assert row["topics"] == [channel["topic_name"] for channel in test_case["channels"]]
+        assert row["failed_reasons"] == failed_reasons(test_case)
+    failed = [row for row in rows if not row["pass"]]
+    assert "TurnCountDiffFailure" in sum([row["failed_reasons"] for row in failed], [])
+    assert any(row["metrics"] is not None and len(row["metrics"]) == len(METRIC_NAMES) for row in failed)
+
+    with open(str(tmp_path / "report" / CASE_INDEX_SCRIPT), encoding="utf-8") as f:
+        assert f.read().startswith("var CASE_INDEX = {")
+    with open(str(tmp_path / "report" / "index.htm"), encoding="utf-8") as f:
+        page = f.read()
+    assert '<script src="%s"></script>' % CASE_INDEX_SCRIPT in page
+    for row in rows:
+        assert 'id="case%d"' % row["index"] in page
+    assert generate(str(tmp_path / "streamed"), True) == case_index, "The streamed report has another index!"
@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import subprocess
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+
+from image_cache import ImageCache
+from pose_pic_gen import TrackParser, RoadPrinter, Keys
+
+
+def load_trajectories():
+    with open(result_file) as res_f:
+        test_cases = json.load(res_f)[Keys.k_test_cases]
+    t_results = [TrackParser(test_case).parse_test_case() for test_case in test_cases]
+    return [t_res for t_res in t_results if t_res.result is True]
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_cache_hit_skips_plotting(tmp_path, monkeypatch):
+    print("take the pictures from the image cache")
+    image_cache = ImageCache(str(tmp_path / "cache"))
+    t_results = load_trajectories()
+    first_images = dict()
+    for t_res in t_results:
+        rp = RoadPrinter(t_res.case_info, t_res.trajectory, str(tmp_path))
+        for image_path in image_cache.plot_pictures(rp):
+            first_images[image_path] = read_file(image_path)
+            os.remove(image_path)
+
+    def fail_plot(self):
+        raise AssertionError("Plotted on a cache hit!")
+    monkeypatch.setattr(RoadPrinter, "init_plot", fail_plot)
+    for t_res in t_results:
+        rp = RoadPrinter(t_res.case_info, t_res.trajectory, str(tmp_path))
+        for image_path in image_cache.plot_pictures(rp):
+            assert read_file(image_path) == first_images[image_path], "Cached picture mismatch!"
+
+    # A different style is a different entry
+    rp = RoadPrinter(t_results[0].case_info, t_results[0].trajectory, str(tmp_path))
+    key = image_cache.make_key(rp.trajectory, rp.style())
+    rp.circle_size += 1
+    assert key != image_cache.make_key(rp.trajectory, rp.style()), "Style is not part of the key!"
+
+
+def test_evict_least_recently_used(tmp_path):
+    print("evict the image cache to its size bound")
+    image = tmp_path / "image.png"
+    image.write_bytes(b"x" * 100)
+    image_cache = ImageCache(str(tmp_path / "cache"), 250)
+    for i, key in enumerate(["a", "b", "c"]):
+        image_cache.store(key, [str(image)])
+        os.utime(image_cache.entry_path(key), (i, i))
+    assert image_cache.evict() == 200
+    assert sorted(os.listdir(image_cache.cache_dir)) == ["b", "c"]
+    assert image_cache.fetch("a", [str(tmp_path / "out.png")]) is False
+
+
+def test_cache_hit_imports_no_plotting(tmp_path):
+    print("render a planning report from a warm image cache without importing matplotlib")
+    code = "\n".join([
+        "import sys",
+        "from report_gen import ReportGen",
+        "from image_cache import ImageCache",
+        "rg = ReportGen(%r, %r, sys.argv[1], 'Planning BVT', 'planning', image_cache=ImageCache(%r))" \
+            % (result_file, os.path.join(root_dir, "it_template"), str(tmp_path / "cache")),
+        "rg.prepare_dirs()",
+        "rg.generate()",
+        "print(' '.join(name for name in ['matplotlib', 'PIL'] if name in sys.modules))"])
+    # The first report fills the cache, the second one only has hits
+    outs = [subprocess.run([sys.executable, "-c", code, str(tmp_path / report)], cwd=root_dir, \
+        stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout.strip() for report in ["cold", "warm"]]
+    assert outs[0] == "matplotlib PIL"
+    assert outs[1] == "", "A cache hit imports %s" % outs[1]
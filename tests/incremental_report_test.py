@@ -0,0 +1,102 @@
+import os
+import sys
+import io
+import json
+from collections import OrderedDict
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+tpl_dir = os.path.join(root_dir, "it_template")
+
+from report_gen import ReportGen, Keys
+from pose_pic_gen import RoadPrinter
+
+
+def read_text(path):
+    with io.open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def generate(res_path, report_dir, stream, incremental=True):
+    rg = ReportGen(res_path, tpl_dir, report_dir, "Planning BVT", "planning", incremental=incremental)
+    rg.prepare_dirs()
+    if stream:
+        rg.generate_streaming()
+    else:
+        rg.generate()
+    return read_text(os.path.join(report_dir, "index.htm"))
+
+
+def test_incremental_rerun(tmp_path, monkeypatch):
+    print("regenerate only the changed cases")
+    with open(result_file) as res_f:
+        result_js = json.load(res_f, object_pairs_hook=OrderedDict)
+    res_path = str(tmp_path / "result.json")
+    with open(res_path, "w") as res_f:
+        json.dump(result_js, res_f)
+
+    full_report = generate(res_path, str(tmp_path / "full"), False, incremental=False)
+    for stream in [False, True]:
+        report_dir = str(tmp_path / ("report%s" % stream))
+        first_report = generate(res_path, report_dir, stream)
+        assert first_report.split() == full_report.split(), "Incremental report mismatch!"
+
+        # Nothing changed, nothing is plotted
+        def fail_plot(self):
+            raise AssertionError("Plotted an unchanged case!")
+        with monkeypatch.context() as m:
+            m.setattr(RoadPrinter, "init_plot", fail_plot)
+            assert generate(res_path, report_dir, stream) == first_report, "Rerun report mismatch!"
+
+        # Only the changed case is rendered again
+        changed_js = json.loads(json.dumps(result_js), object_pairs_hook=OrderedDict)
+        changed_js[Keys.k_test_cases][0][Keys.k_descriptions]["JIRA ID"] = "XW-0000"
+        changed_path = str(tmp_path / "changed.json")
+        with open(changed_path, "w") as res_f:
+            json.dump(changed_js, res_f)
+        with monkeypatch.context() as m:
+            m.setattr(RoadPrinter, "init_plot", fail_plot)
+            changed_report = generate(changed_path, report_dir, stream)
+        assert "XW-0000" in changed_report
+        assert changed_report.replace("XW-0000", "XW-6513") == first_report
+
+
+def test_incremental_case_inserted(tmp_path, monkeypatch):
+    print("reuse the cases moved by a case inserted at the top")
+    with open(result_file) as res_f:
+        result_js = json.load(res_f, object_pairs_hook=OrderedDict)
+    res_path = str(tmp_path / "result.json")
+    with open(res_path, "w") as res_f:
+        json.dump(result_js, res_f)
+    inserted_js = json.loads(json.dumps(result_js), object_pairs_hook=OrderedDict)
+    new_case = json.loads(json.dumps(inserted_js[Keys.k_test_cases][-1]), object_pairs_hook=OrderedDict)
+    new_case[Keys.k_descriptions]["Test Case ID"] = "inserted"
+    new_case[Keys.k_descriptions]["Description"] = "An inserted case"
+    inserted_js[Keys.k_test_cases].insert(0, new_case)
+    inserted_path = str(tmp_path / "inserted.json")
+    with open(inserted_path, "w") as res_f:
+        json.dump(inserted_js, res_f)
+
+    def fail_plot(self):
+        raise AssertionError("Plotted a moved case!")
+    for stream, lazy_cases in [(False, False), (True, False), (False, True)]:
+        report_dir = str(tmp_path / ("report%s%s" % (stream, lazy_cases)))
+        for path in [res_path, inserted_path]:
+            rg = ReportGen(path, tpl_dir, report_dir, "Planning BVT", "planning", incremental=True, \
+                lazy_cases=lazy_cases)
+            rg.prepare_dirs()
+            with monkeypatch.context() as m:
+                if path == inserted_path:
+                    m.setattr(RoadPrinter, "init_plot", fail_plot)
+                if stream:
+                    rg.generate_streaming()
+                else:
+                    rg.generate()
+        assert rg.timer.counters.get("rendered_details") == 1, "Moved cases are rendered again!"
+        expected = generate(inserted_path, str(tmp_path / ("full%s%s" % (stream, lazy_cases))), stream, \
+            incremental=False)
+        if not lazy_cases:
+            assert read_text(os.path.join(report_dir, "index.htm")).split() == expected.split()
+        else:
+            assert "An inserted case" in read_text(os.path.join(report_dir, "index.htm"))
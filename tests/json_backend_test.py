@@ -0,0 +1,56 @@
+import os
+import sys
+import io
+import json
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+tpl_dir = os.path.join(root_dir, "it_template")
+
+import json_backend
+from report_gen import ReportGen
+
+
+def installed_backends():
+    backends = list()
+    for name in json_backend.BACKEND_NAMES:
+        try:
+            backends.append(json_backend.find_backend(name))
+        except ImportError:
+            continue
+    return backends
+
+
+def test_backends_decode_the_same():
+    print("every installed JSON backend decodes the result file the same")
+    with open(result_file) as res_f:
+        expected = json.load(res_f)
+    for backend in installed_backends():
+        assert backend.load(result_file) == expected, "%s decodes differently!" % backend.name
+        # What only the standard library accepts is decoded by it
+        assert backend.loads('{"nan": NaN}')["nan"] != backend.loads('{"nan": NaN}')["nan"]
+    assert json_backend.find_backend("auto").name == installed_backends()[0].name
+    try:
+        json_backend.find_backend("simplejson")
+        assert False, "Unknown backend accepted!"
+    except ValueError:
+        pass
+
+
+def test_backends_render_the_same(tmp_path):
+    print("render the report with every installed JSON backend")
+    old_backend = json_backend.backend
+    reports = list()
+    try:
+        for backend in installed_backends():
+            json_backend.use_backend(backend.name)
+            report_dir = str(tmp_path / backend.name)
+            rg = ReportGen(result_file, tpl_dir, report_dir, "Planning BVT", "planning")
+            rg.prepare_dirs()
+            rg.generate()
+            with io.open(os.path.join(report_dir, "index.htm"), encoding="utf-8") as f:
+                reports.append(f.read().replace(report_dir, ""))
+    finally:
+        json_backend.backend = old_backend
+    assert all(report == reports[0] for report in reports), "Reports differ between JSON backends!"
@@ -0,0 +1,47 @@
+import os
+import sys
+import io
+import json
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+tpl_dir = os.path.join(root_dir, "it_template")
+
+from report_gen import ReportGen
+
+
+def read_text(path):
+    with io.open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_lazy_report_fragments(tmp_path):
+    print("render a summary page with one fragment per case")
+    for stream in [False, True]:
+        full_dir = str(tmp_path / ("full%s" % stream))
+        lazy_dir = str(tmp_path / ("lazy%s" % stream))
+        for report_dir, lazy_cases in [(full_dir, False), (lazy_dir, True)]:
+            rg = ReportGen(result_file, tpl_dir, report_dir, "Planning BVT", "planning", lazy_cases=lazy_cases)
+            rg.prepare_dirs()
+            if stream:
+                rg.generate_streaming()
+            else:
+                rg.generate()
+
+        full_report = read_text(os.path.join(full_dir, "index.htm"))
+        lazy_report = read_text(os.path.join(lazy_dir, "index.htm"))
+        fragments = sorted(name for name in os.listdir(os.path.join(lazy_dir, "cases")) if name.endswith(".htm"))
+        assert fragments == sorted("%s.htm" % index for index in range(24)), "Fragments mismatch!"
+        assert "channel id" not in lazy_report, "Lazy report inlines the case details!"
+        assert lazy_report.count("data-fragment=") == 24
+        for fragment in fragments:
+            fragment_html = read_text(os.path.join(lazy_dir, "cases", fragment))
+            assert fragment_html.strip() in full_report, "Fragment %s mismatch!" % fragment
+            # The script loading the fragment from file://
+            index = int(fragment.split(".")[0])
+            assert 'data-fragment="cases/%d.js"' % index in lazy_report
+            script = read_text(os.path.join(lazy_dir, "cases", "%d.js" % index))
+            prefix = 'fill_case("cases/%d.js", ' % index
+            assert script.startswith(prefix) and script.endswith(");\n")
+            assert json.loads(script[len(prefix):-len(");\n")]) == fragment_html
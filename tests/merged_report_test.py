@@ -0,0 +1,64 @@
+import os
+import sys
+import io
+import json
+import subprocess
+from collections import OrderedDict
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+tpl_dir = os.path.join(root_dir, "it_template")
+
+from merged_report_gen import MergedReportGen, parse_shards
+from report_gen import Keys
+
+
+def write_shard(path, test_cases):
+    passed_cases = len([test_case for test_case in test_cases if test_case[Keys.k_case_pass]])
+    shard_js = OrderedDict([("passed_cases", passed_cases), ("failed_cases", len(test_cases) - passed_cases),
+        ("pass_rate", 100.0 * passed_cases / len(test_cases)), (Keys.k_test_cases, test_cases)])
+    with open(path, "w") as shard_f:
+        json.dump(shard_js, shard_f)
+
+
+def test_merge_shards(tmp_path):
+    print("merge the shards of two modules into one report")
+    with open(result_file) as res_f:
+        test_cases = json.load(res_f, object_pairs_hook=OrderedDict)[Keys.k_test_cases]
+    write_shard(str(tmp_path / "planning-0.json"), test_cases[:10])
+    write_shard(str(tmp_path / "planning-1.json"), test_cases[10:])
+    write_shard(str(tmp_path / "perception-0.json"), test_cases[:3])
+    shards = parse_shards(["planning=%s" % (tmp_path / "planning-*.json"), \
+        "perception=%s" % (tmp_path / "perception-*.json")])
+    assert [shard.module_name for shard in shards] == ["planning", "planning", "perception"]
+
+    reports = list()
+    for jobs in [1, 3]:
+        report_dir = str(tmp_path / ("report%s" % jobs))
+        mrg = MergedReportGen(shards, tpl_dir, report_dir, "Nightly BVT", jobs=jobs)
+        mrg.prepare_dirs()
+        merged = mrg.generate()
+        assert merged["passed_cases"] == 22 + 3 and merged["failed_cases"] == 2
+        assert merged["pass_rate"] == round(100.0 * 25 / 27, 2)
+        planning = merged["modules"][0]
+        assert (planning["passed_cases"], planning["failed_cases"], planning["pass_rate"]) == (22, 2, 91.67)
+        with io.open(os.path.join(report_dir, "index.htm"), encoding="utf-8") as f:
+            reports.append(f.read())
+        assert reports[-1].count("id=\"tbl_content") == 27
+        assert len(set(reports[-1].split("id=\"tbl_content")[1:])) == 27, "Case ids are not unique!"
+        assert os.listdir(os.path.join(report_dir, "images", "0")) != [], "Shard pictures missing!"
+    assert reports[0] == reports[1].replace("report3", "report1"), "Parallel merged report mismatch!"
+
+
+def test_merged_cli_shares_options(tmp_path):
+    print("render a merged report with the options of the single report CLI")
+    with open(result_file) as res_f:
+        test_cases = json.load(res_f, object_pairs_hook=OrderedDict)[Keys.k_test_cases]
+    write_shard(str(tmp_path / "planning-0.json"), test_cases)
+    report_dir = str(tmp_path / "report")
+    subprocess.run([sys.executable, "merged_report_gen.py", tpl_dir, report_dir, "Nightly BVT", \
+        "planning=%s" % (tmp_path / "planning-*.json"), "--json-backend", "json", "--lazy-cases", \
+        "--image-cache", str(tmp_path / "cache"), "--log-level", "WARNING"], cwd=root_dir, check=True)
+    assert os.path.exists(os.path.join(report_dir, "index.htm"))
+    assert os.listdir(str(tmp_path / "cache")), "The image cache is not used!"
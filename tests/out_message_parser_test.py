@@ -0,0 +1,55 @@
+import os
+import sys
+import json
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+
+from pose_pic_gen import OutMessageParser, Keys, Consts
+
+
+# The line by line parser OutMessageParser replaced, kept as the reference
+def legacy_parse(raw_message):
+    state = None
+    lines = {"actual": [], "expect": []}
+    for msg_line in raw_message.split("<br/>"):
+        if state is None:
+            if msg_line.strip() == "Actual Message:":
+                state = "actual"
+            if msg_line.strip() == "Expect Message:":
+                state = "expect"
+        elif msg_line.strip() != "":
+            lines[state].append(msg_line)
+        else:
+            state = None
+    return json.loads("".join(lines["actual"])), json.loads("".join(lines["expect"]))
+
+
+def trajectory_messages():
+    with open(result_file) as res_f:
+        test_cases = json.load(res_f)[Keys.k_test_cases]
+    for test_case in test_cases:
+        for channel in test_case[Keys.k_channels]:
+            if channel[Keys.k_topic_name] == Consts.TRAJECTORY_TOPIC_NAME and Keys.k_failed_reason in channel:
+                yield channel[Keys.k_out_messages][0]
+
+
+def test_parse_result_messages():
+    print("parse the output messages of result.json")
+    messages = list(trajectory_messages())
+    assert len(messages) > 0, "No trajectory output message in result.json!"
+    for raw_message in messages:
+        actual_msg, expect_msg = OutMessageParser(raw_message).parse()
+        assert (actual_msg, expect_msg) == legacy_parse(raw_message), "Parsed messages mismatch!"
+        assert len(actual_msg[Keys.k_waypoints]) > 0
+
+
+def test_parse_section_edges():
+    print("parse sections split on several lines")
+    raw_message = "Current dtw value: 1<br/>text with Actual Message: inside<br/>" \
+        "  Actual Message:  <br/>{\"waypoints\": <br/>[1, 2]}<br/> <br/>" \
+        "Expect Message:<br/>[{\"waypoints\": []},<br/>{\"waypoints\": [3]}]"
+    assert OutMessageParser(raw_message).parse() == legacy_parse(raw_message)
+    assert OutMessageParser(raw_message).parse() == ({"waypoints": [1, 2]}, \
+        [{"waypoints": []}, {"waypoints": [3]}])
@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+
+from report_gen import ReportGen, Keys
+
+
+def plot_failed_cases(report_dir, jobs):
+    os.makedirs(os.path.join(report_dir, "images"))
+    with open(result_file) as res_f:
+        test_cases = json.load(res_f)[Keys.k_test_cases]
+    failed_test_cases = [test_case for test_case in test_cases if not test_case[Keys.k_case_pass]]
+    rg = ReportGen(result_file, None, report_dir, "Planning BVT", "planning", jobs=jobs)
+    rg.plot_failed_cases(failed_test_cases)
+    saved_images = list()
+    for failed_case in failed_test_cases:
+        for channel in failed_case[Keys.k_channels]:
+            saved_images.append(channel[Keys.k_saved_images])
+    return saved_images
+
+
+def read_images(report_dir):
+    image_dir = os.path.join(report_dir, "images")
+    images = dict()
+    for name in os.listdir(image_dir):
+        with open(os.path.join(image_dir, name), "rb") as f:
+            images[name] = f.read()
+    return images
+
+
+def test_parallel_plot_matches_serial(tmp_path):
+    print("plot failed cases serially and with a process pool")
+    serial_dir = str(tmp_path / "serial")
+    parallel_dir = str(tmp_path / "parallel")
+    serial_images = plot_failed_cases(serial_dir, 1)
+    parallel_images = plot_failed_cases(parallel_dir, 2)
+
+    assert serial_images == parallel_images, "Saved image paths differ!"
+    serial_files = read_images(serial_dir)
+    assert len(serial_files) > 0, "No image generated!"
+    assert serial_files == read_images(parallel_dir), "Parallel images are not byte-identical!"
@@ -1,11 +1,14 @@
 import os
-from jinja2 import FileSystemLoader, Environment
+import sys
 from collections import namedtuple
 
 Person = namedtuple("Person", ["name", "age", "sex"])
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 source_dir = os.path.join(root_dir, "sources") 
 dest_dir = os.path.join(root_dir, "dests") 
+sys.path.insert(0, root_dir)
+
+from render_env import get_environment
 
 class Student(object):
     def __init__(self, name, age, score):
@@ -16,10 +19,7 @@ class Student(object):
 
 def test_render_list():
     print("render list")
-    loader = FileSystemLoader(source_dir)
-    env = Environment(
-        loader = loader
-    )
+    env = get_environment(source_dir)
     persons = [Person("ZhangSan", 23, "Man"),
                 Person("LiSi", 22, "Man"),
                 Person("YanYuanYuan", 18, "Woman")]    
@@ -34,10 +34,7 @@ def test_render_list():
 
 def test_render_object():
     print("render object")
-    loader = FileSystemLoader(source_dir)
-    env = Environment(
-        loader = loader
-    )
+    env = get_environment(source_dir)
 
     template = env.get_template('obj.htm')
     stu = Student("ZhangSan", 18, 81)
@@ -50,10 +47,7 @@ def test_render_object():
 
 def test_render_dict():
     print("render dict")
-    loader = FileSystemLoader(source_dir)
-    env = Environment(
-        loader = loader
-    )
+    env = get_environment(source_dir)
 
     template = env.get_template('dict.htm')
     dic = {
@@ -70,3 +64,12 @@ def test_render_dict():
     assert True, "Test render dict failed!"
 
 
+
+
+def test_shared_environment(tmp_path):
+    print("share the compiled templates")
+    env = get_environment(source_dir, str(tmp_path))
+    assert env is get_environment(source_dir, str(tmp_path)), "Environment is not shared!"
+    template = env.get_template('list.htm')
+    assert template is env.get_template('list.htm'), "Template is compiled again!"
+    assert len(os.listdir(str(tmp_path))) == 1, "Bytecode is not cached!"
@@ -0,0 +1,32 @@
+import os
+import sys
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+sys.path.insert(0, os.path.join(root_dir, "benchmarks"))
+
+from pose_pic_gen import TrackParser, Keys
+from report_bench import make_result, find_regressions
+
+
+def test_synthetic_result_parses():
+    print("parse the trajectories of a synthetic result")
+    result = make_result(20, 0.25, 30, 3, seed=1)
+    test_cases = result[Keys.k_test_cases]
+    assert len(test_cases) == 20
+    assert result["failed_cases"] == 5
+    failed_cases = [test_case for test_case in test_cases if not test_case[Keys.k_case_pass]]
+    assert len(failed_cases) == 5
+    for failed_case in failed_cases:
+        t_res = TrackParser(failed_case).parse_test_case()
+        assert t_res.result is True
+        assert len(t_res.trajectory.expect_tracks) == 3
+        assert len(t_res.trajectory.actual_track) == 30
+    assert make_result(20, 0.25, 30, 3, seed=1) == result, "Generator is not deterministic!"
+
+
+def test_find_regressions():
+    print("flag the stages slower than the baseline")
+    baseline = {"stages": {"json_load": {"seconds": 1.0}, "render_report": {"seconds": 1.0}}}
+    current = {"stages": {"json_load": {"seconds": 1.1}, "render_report": {"seconds": 1.5}, "new": {"seconds": 9.0}}}
+    assert find_regressions(baseline, current, 0.2) == [("render_report", 1.0, 1.5)]
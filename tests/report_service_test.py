@@ -0,0 +1,163 @@
+import os
+import sys
+import json
+import queue
+import shutil
+import threading
+from urllib.request import urlopen, Request
+from urllib.error import HTTPError
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+tpl_dir = os.path.join(root_dir, "it_template")
+
+from report_gen import ReportSpec
+from report_service import ReportService, make_server
+from asset_store import AssetStore
+from image_cache import ImageCache
+
+
+def post_json(url, js):
+    req = Request(url, data=json.dumps(js).encode("utf-8"), headers={"Content-Type": "application/json"})
+    try:
+        with urlopen(req) as resp:
+            return resp.status, json.loads(resp.read().decode("utf-8"))
+    except HTTPError as e:
+        return e.code, json.loads(e.read().decode("utf-8"))
+
+
+def test_serve_reports(tmp_path):
+    print("render reports requested over HTTP with a warm service")
+    service = ReportService(tpl_dir, {}, 1, 4)
+    service.warm_up()
+    service.start()
+    server = make_server(service, "127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = "http://127.0.0.1:%d" % server.server_address[1]
+    try:
+        for stream in [False, True]:
+            report_dir = str(tmp_path / ("report_%s" % stream))
+            status, job = post_json(url + "/reports?wait=1", {"result_file": result_file, "report_dir": report_dir, \
+                "report_name": "Planning BVT", "module_name": "planning", "stream": stream})
+            assert status == 200 and job["status"] == "done", job
+            assert os.path.exists(os.path.join(report_dir, "index.htm"))
+            with urlopen("%s/reports/%d" % (url, job["id"])) as resp:
+                assert json.loads(resp.read().decode("utf-8"))["status"] == "done"
+
+        status, job = post_json(url + "/reports?wait=1", {"result_file": str(tmp_path / "missing.json"), \
+            "report_dir": str(tmp_path / "missing"), "report_name": "Missing", "module_name": "planning"})
+        assert status == 500 and job["status"] == "failed" and "missing.json" in job["error"]
+        status, _ = post_json(url + "/reports", {"result_file": result_file})
+        assert status == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.stop()
+
+
+def test_queue_is_bounded(tmp_path):
+    print("refuse the reports over the queue size")
+    service = ReportService(tpl_dir, {}, 1, 2)
+    spec = ReportSpec(result_file, str(tmp_path / "report"), "Planning BVT", "planning")
+    jobs = [service.submit(spec) for _ in range(2)]
+    try:
+        service.submit(spec)
+        assert False, "The queue is not bounded!"
+    except queue.Full:
+        pass
+    service.start()
+    for job in jobs:
+        job.done.wait()
+        assert job.status == "done"
+    service.stop()
+
+
+def test_parallel_workers_share_caches(tmp_path):
+    print("render reports in two worker threads sharing the asset store and the image cache")
+    options = {"asset_store": AssetStore(str(tmp_path / "assets"), "hardlink"), \
+        "image_cache": ImageCache(str(tmp_path / "cache"))}
+    service = ReportService(tpl_dir, options, 2, 8)
+    service.warm_up()
+    service.start()
+    assert service.pool is not None, "Two worker threads plot in the same process!"
+    try:
+        specs = [ReportSpec(result_file, str(tmp_path / ("report%d" % i)), "Planning BVT", "planning") \
+            for i in range(6)]
+        jobs = [service.submit(spec, stream=i % 2 == 1) for i, spec in enumerate(specs)]
+        for job in jobs:
+            job.done.wait()
+            assert job.status == "done", job.error
+        for spec in specs:
+            assert os.path.exists(os.path.join(spec.report_path, "index.htm"))
+            assert len(os.listdir(os.path.join(spec.report_path, "images"))) == 1
+        assert [name for name in os.listdir(str(tmp_path / "cache")) if ".tmp" in name] == []
+        assert [name for name in os.listdir(str(tmp_path / "assets")) if ".tmp" in name] == []
+    finally:
+        service.stop()
+    assert service.pool is None
+
+
+def test_edited_templates_are_reloaded(tmp_path):
+    print("render with the templates edited while the service runs")
+    tpl_copy = str(tmp_path / "tpl")
+    shutil.copytree(tpl_dir, tpl_copy)
+    service = ReportService(tpl_copy, {}, 1, 4, True)
+    service.warm_up()
+    service.start()
+    try:
+        spec = ReportSpec(result_file, str(tmp_path / "report"), "Planning BVT", "planning")
+        job = service.submit(spec)
+        job.done.wait()
+        assert job.status == "done" and job.stream is True, "The service default stream is not used!"
+        index_tpl = os.path.join(tpl_copy, "index-tpl.html")
+        with open(index_tpl) as f:
+            text = f.read()
+        with open(index_tpl, "w") as f:
+            f.write(text.replace("Failed Cases</h1>", "Failed Cases (edited)</h1>"))
+        # The template loader compares modification times, make sure the edit is newer
+        mtime = os.path.getmtime(index_tpl) + 2
+        os.utime(index_tpl, (mtime, mtime))
+        job = service.submit(spec, stream=False)
+        job.done.wait()
+        assert job.status == "done" and job.stream is False
+        with open(os.path.join(spec.report_path, "index.htm")) as f:
+            assert "Failed Cases (edited)" in f.read(), "The old template is still used!"
+    finally:
+        service.stop()
+
+
+def test_parallel_workers_profile(tmp_path):
+    print("profile the reports of two worker threads")
+    profile_dir = str(tmp_path / "profile")
+    service = ReportService(tpl_dir, {"profile_dir": profile_dir}, 2, 8)
+    service.start()
+    try:
+        specs = [ReportSpec(result_file, str(tmp_path / ("report%d" % i)), "Planning BVT", "planning") \
+            for i in range(6)]
+        jobs = [service.submit(spec) for spec in specs]
+        for job in jobs:
+            job.done.wait()
+            assert job.status == "done", job.error
+    finally:
+        service.stop()
+    for i in range(6):
+        assert os.path.exists(os.path.join(profile_dir, "report%d.tracemalloc.txt" % i))
+
+
+def test_stream_with_sorted_failed_cases(tmp_path):
+    print("refuse streamed reports when the failed cases are sorted")
+    try:
+        ReportService(tpl_dir, {"sort_failed_by": "dtw"}, 1, 4, True)
+        assert False, "The service streams reports it can't sort!"
+    except ValueError:
+        pass
+    service = ReportService(tpl_dir, {"sort_failed_by": "dtw"}, 1, 4)
+    spec = ReportSpec(result_file, str(tmp_path / "report"), "Planning BVT", "planning")
+    try:
+        service.submit(spec, stream=True)
+        assert False, "A streamed report is queued with sorted failed cases!"
+    except ValueError:
+        pass
+    assert service.queue.qsize() == 0
@@ -0,0 +1,63 @@
+import os
+import sys
+import io
+import json
+from collections import OrderedDict
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+tpl_dir = os.path.join(root_dir, "it_template")
+
+from result_reader import ResultReader
+from report_gen import ReportGen, Keys
+
+
+def load_result():
+    with open(result_file) as res_f:
+        return json.load(res_f, object_pairs_hook=OrderedDict)
+
+
+def test_read_result_incrementally():
+    print("read result.json one test case at a time")
+    result_js = load_result()
+    test_cases = result_js.pop(Keys.k_test_cases)
+    # A tiny chunk size makes every value cross chunk boundaries
+    for chunk_size in [7, 64, 1 << 20]:
+        reader = ResultReader(result_file, chunk_size)
+        assert reader.read_header() == result_js, "Header mismatch!"
+        assert list(reader.iter_test_cases()) == test_cases, "Test cases mismatch!"
+
+
+def test_header_after_test_cases(tmp_path):
+    print("read header fields written after the test cases")
+    test_cases = [{"descriptions": {"Description": "brackets ] } [ { and \"quotes\\\""}, "pass": True},
+                  {"descriptions": {"Description": "\\\\"}, "pass": False}]
+    res_path = str(tmp_path / "result.json")
+    with open(res_path, "w") as res_f:
+        res_f.write('{"test_cases": %s, "passed_cases": 1, "pass_rate": 50.0}' % json.dumps(test_cases))
+    for chunk_size in [1, 5, 1 << 20]:
+        reader = ResultReader(res_path, chunk_size)
+        assert reader.read_header() == {"passed_cases": 1, "pass_rate": 50.0}, "Header mismatch!"
+        assert list(reader.iter_test_cases()) == test_cases, "Test cases mismatch!"
+
+
+def test_streamed_report_matches_in_memory(tmp_path):
+    print("render the report from the streamed result file")
+    stream_dir = str(tmp_path / "stream")
+    memory_dir = str(tmp_path / "memory")
+    for report_dir in [stream_dir, memory_dir]:
+        os.makedirs(os.path.join(report_dir, "images"))
+
+    rg = ReportGen(result_file, tpl_dir, stream_dir, "Planning BVT", "planning")
+    rg.generate_streaming()
+
+    rg = ReportGen(result_file, tpl_dir, memory_dir, "Planning BVT", "planning")
+    rg.generate()
+    with io.open(os.path.join(memory_dir, "index.htm"), encoding="utf-8") as f:
+        expected_report = f.read()
+
+    with io.open(os.path.join(stream_dir, "index.htm"), encoding="utf-8") as f:
+        assert f.read() == expected_report.replace(memory_dir, stream_dir), "Streamed report mismatch!"
+    assert sorted(os.listdir(os.path.join(stream_dir, "images"))) == \
+        sorted(os.listdir(os.path.join(memory_dir, "images"))), "Streamed report images mismatch!"
@@ -0,0 +1,70 @@
+import os
+import sys
+import json
+import gc
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from PIL import Image
+from pose_pic_gen import TrackParser, RoadPrinter, Keys, IMAGE_FORMATS, thumbnail_path
+
+
+def load_trajectories():
+    with open(result_file) as res_f:
+        test_cases = json.load(res_f)[Keys.k_test_cases]
+    t_results = [TrackParser(test_case).parse_test_case() for test_case in test_cases]
+    return [t_res for t_res in t_results if t_res.result is True]
+
+
+def test_plot_pictures_releases_figures(tmp_path):
+    print("plot pictures without leaking figures")
+    t_results = load_trajectories()
+    assert len(t_results) > 0, "No failed trajectory in result.json!"
+    for _ in range(3):
+        for t_res in t_results:
+            rp = RoadPrinter(t_res.case_info, t_res.trajectory, str(tmp_path))
+            image_paths = rp.plot_pictures()
+            assert len(image_paths) == len(t_res.trajectory.expect_tracks)
+            assert rp.figure is None, "Figure is not released after plotting!"
+    assert plt.get_fignums() == [], "pyplot figure manager is used!"
+    gc.collect()
+    live_figures = [obj for obj in gc.get_objects() if isinstance(obj, Figure)]
+    assert live_figures == [], "Figures are still alive after plotting!"
+
+
+def test_image_output_modes(tmp_path):
+    print("plot combined pictures in every image format with thumbnails")
+    t_res = load_trajectories()[0]
+    for image_format in sorted(IMAGE_FORMATS):
+        image_dir = tmp_path / image_format
+        image_dir.mkdir()
+        rp = RoadPrinter(t_res.case_info, t_res.trajectory, str(image_dir))
+        rp.image_format = image_format
+        rp.combined = True
+        rp.thumbnail_size = 120
+        image_paths = rp.plot_pictures()
+        assert len(image_paths) == 1, "Combined mode made more than one picture!"
+        assert image_paths[0].endswith("_all." + IMAGE_FORMATS[image_format][0])
+        assert sorted(os.listdir(str(image_dir))) == sorted(os.path.basename(path) for path in rp.output_paths())
+        thumbnail = Image.open(thumbnail_path(image_paths[0]))
+        assert max(thumbnail.size) == 120, "Thumbnail is not resized!"
+
+
+def test_report_links_thumbnails(tmp_path):
+    print("show thumbnails linking to the full size pictures in the report")
+    from report_gen import ReportGen
+    report_dir = str(tmp_path / "report")
+    rg = ReportGen(result_file, os.path.join(root_dir, "it_template"), report_dir, "Planning BVT", "planning", \
+        image_format="png-compressed", thumbnail_size=160)
+    rg.prepare_dirs()
+    rg.generate()
+    with open(os.path.join(report_dir, "index.htm")) as f:
+        report = f.read()
+    for name in os.listdir(os.path.join(report_dir, "images")):
+        if ".thumb." not in name:
+            assert 'images/%s" target="_blank"><img src=' % name in report
+            assert 'images/%s" class=' % thumbnail_path(name) in report
@@ -0,0 +1,54 @@
+import os
+import sys
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+tpl_dir = os.path.join(root_dir, "it_template")
+
+from stage_timer import StageTimer
+from report_gen import ReportGen
+from pose_pic_gen import PosePrint
+
+
+def test_stage_timer_summary():
+    print("sum the stages and keep the slowest cases")
+    timer = StageTimer(2)
+    with timer.stage("render", 3):
+        pass
+    timer.add("render", 1.0, 2)
+    timer.count("images", 4)
+    for label, seconds in [("a", 0.1), ("b", 0.3), ("c", 0.2)]:
+        timer.add_case(label, {"plot": seconds})
+    assert timer.stages["render"][1:] == [2, 5]
+    assert timer.stages["case_plot"][1:] == [3, 3]
+    summary = timer.summary()
+    assert "images" in summary
+    assert summary.index("  0.300  b") < summary.index("  0.200  c")
+    assert "  0.100  a" not in summary
+
+
+def test_report_timings_and_profile(tmp_path):
+    print("time the report stages and dump the profile")
+    report_dir = str(tmp_path / "report")
+    profile_dir = str(tmp_path / "profile")
+    rg = ReportGen(result_file, tpl_dir, report_dir, "Planning BVT", "planning", profile_dir=profile_dir)
+    rg.prepare_dirs()
+    rg.generate()
+    for stage in ["json_load", "json_convert", "plot_failed_cases", "case_plot", "render_report"]:
+        assert stage in rg.timer.stages, "Stage %s not timed!" % stage
+    assert rg.timer.counters["cases"] == 24
+    assert sorted(os.listdir(profile_dir)) == ["report.prof", "report.pstats.txt", "report.tracemalloc.txt"]
+
+
+def test_pose_print_timings_and_profile(tmp_path):
+    print("time the pictures of pose_pic_gen and dump the profile")
+    profile_dir = str(tmp_path / "profile")
+    p = PosePrint(result_file, str(tmp_path), profile_dir)
+    p.print_poses()
+    for stage in ["print_poses", "case_parse", "case_plot"]:
+        assert stage in p.timer.stages, "Stage %s not timed!" % stage
+    assert p.timer.counters["cases"] == 24
+    assert p.timer.counters["plotted_cases"] == 1
+    assert sorted(os.listdir(profile_dir)) == ["pose_pic_gen.prof", "pose_pic_gen.pstats.txt", \
+        "pose_pic_gen.tracemalloc.txt"]
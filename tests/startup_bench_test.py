@@ -0,0 +1,27 @@
+import os
+import sys
+import subprocess
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+sys.path.insert(0, os.path.join(root_dir, "benchmarks"))
+
+from startup_bench import parse_importtime, HEAVY_PACKAGES
+
+
+def test_parse_importtime():
+    print("read the cumulative times of python -X importtime")
+    stderr = "\n".join(["import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |   jinja2.utils",
+        "import time:      2000 |      33122 | report_gen",
+        "Traceback is not a time line"])
+    assert parse_importtime(stderr) == {"jinja2.utils": 120, "report_gen": 33122}
+
+
+def test_report_gen_imports_no_plotting():
+    print("import the report entry points without numpy, matplotlib or PIL")
+    code = "import sys, report_gen, batch_report_gen, case_index; " \
+        "print(' '.join(p for p in %r if p in sys.modules))" % HEAVY_PACKAGES
+    out = subprocess.run([sys.executable, "-c", code], cwd=root_dir, stdout=subprocess.PIPE, \
+        universal_newlines=True, check=True).stdout
+    assert out.strip() == "", "Plotting packages are imported at startup: %s" % out
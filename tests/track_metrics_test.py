@@ -0,0 +1,115 @@
+import os
+import sys
+import math
+import subprocess
+import numpy as np
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+tpl_dir = os.path.join(root_dir, "it_template")
+
+from pose_pic_gen import Track, TrackParser, Keys
+from report_gen import ReportGen
+from track_metrics import dtw_distance, frechet_distance, heading_error, turn_count, trajectory_metrics
+
+
+def make_track(points, thetas=None, directions=None):
+    waypoints = list()
+    for i, (x, y) in enumerate(points):
+        theta = thetas[i] if thetas is not None else 0.0
+        direction = directions[i] if directions is not None else "kForward"
+        waypoints.append({Keys.k_pose: {Keys.k_x: x, Keys.k_y: y, Keys.k_theta: theta}, \
+            Keys.k_direction: direction, Keys.k_speed: 0.5})
+    return Track.from_waypoints(waypoints)
+
+
+# The textbook O(n * m) matrix dynamic programming, the reference of the vectorized one
+def reference_align(a, b, frechet):
+    n, m = len(a), len(b)
+    d = np.full((n + 1, m + 1), np.inf)
+    d[0, 0] = 0.0
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            cost = math.hypot(a[i - 1][0] - b[j - 1][0], a[i - 1][1] - b[j - 1][1])
+            best = min(d[i - 1, j - 1], d[i - 1, j], d[i, j - 1])
+            d[i, j] = max(cost, best) if frechet else cost + best
+    return d[n, m]
+
+
+def test_alignment_matches_reference():
+    print("vectorized DTW and Frechet against the matrix dynamic programming")
+    rng = np.random.RandomState(7)
+    for n, m in [(1, 1), (1, 5), (7, 3), (20, 33)]:
+        a = rng.uniform(-5, 5, (n, 2)).tolist()
+        b = rng.uniform(-5, 5, (m, 2)).tolist()
+        track_a, track_b = make_track(a), make_track(b)
+        assert np.isclose(dtw_distance(track_a, track_b), reference_align(a, b, False))
+        assert np.isclose(frechet_distance(track_a, track_b), reference_align(a, b, True))
+        # A band as wide as the matrix is the full alignment, a narrow one can only be worse
+        assert np.isclose(dtw_distance(track_a, track_b, band=1.0), reference_align(a, b, False))
+        assert dtw_distance(track_a, track_b, band=0.05) >= dtw_distance(track_a, track_b) - 1e-9
+
+
+def test_long_tracks_are_banded():
+    print("long tracks are aligned inside a band")
+    t = np.linspace(0, 20, 5000)
+    track_a = make_track(np.column_stack((t, np.sin(t))).tolist())
+    track_b = make_track(np.column_stack((t, np.sin(t) + 0.1)).tolist())
+    assert np.isclose(frechet_distance(track_a, track_b), 0.1)
+    assert dtw_distance(track_a, track_b) < 0.1 * len(t) + 1e-6
+
+
+def test_heading_and_turns():
+    print("wrapped heading error and direction switches")
+    track_a = make_track([(0, 0), (1, 0)], thetas=[0.0, math.pi - 0.1])
+    track_b = make_track([(0, 0), (1, 0)], thetas=[0.0, -math.pi + 0.1])
+    assert np.isclose(heading_error(track_a, track_b), 0.2)
+    track = make_track([(0, 0)] * 5, directions=["kForward", "kBackward", "kBackward", "kForward", "kBackward"])
+    assert turn_count(track) == 3
+
+
+def test_case_metrics():
+    print("metrics of the failed planning cases of the sample result")
+    import json
+    with open(result_file) as res_f:
+        test_cases = json.load(res_f)[Keys.k_test_cases]
+    failed_case = [test_case for test_case in test_cases if not test_case[Keys.k_case_pass]][0]
+    t_res = TrackParser(failed_case).parse_test_case()
+    metrics = trajectory_metrics(t_res.trajectory)
+    assert len(metrics["tracks"]) == len(t_res.trajectory.expect_tracks)
+    assert metrics["dtw"] == min(track["dtw"] for track in metrics["tracks"])
+    assert metrics["frechet"] <= metrics["dtw"]
+
+
+def test_report_sorted_by_metric(tmp_path):
+    print("render the metrics and sort the failed cases by them")
+    report_dir = str(tmp_path / "report")
+    rg = ReportGen(result_file, tpl_dir, report_dir, "Planning BVT", "planning", sort_failed_by="dtw")
+    rg.prepare_dirs()
+    json_result = rg.load_result()
+    values = [test_case["metrics"]["dtw"] for test_case in json_result["failed_test_cases"] if "metrics" in test_case]
+    assert len(values) > 0, "No metrics computed!"
+    assert values == sorted(values, reverse=True), "Failed cases are not sorted by DTW!"
+    rg.render_report(rg.add_case_lists(json_result, json_result["failed_test_cases"], json_result["passed_test_cases"]))
+    with open(os.path.join(report_dir, "index.htm")) as f:
+        assert "Trajectory Metrics" in f.read()
+
+
+def test_sort_by_signed_metric():
+    print("sort the failed cases by the distance of a signed metric to 0")
+    rg = ReportGen(result_file, tpl_dir, "report", "Planning BVT", "planning", sort_failed_by="turn_count_diff")
+    diffs = [1, -4, 0, None, 3]
+    failed_cases = [{"metrics": {"turn_count_diff": diff}} if diff is not None else {} for diff in diffs]
+    sorted_diffs = [case.get("metrics", {}).get("turn_count_diff") for case in rg.sort_failed_cases(failed_cases)]
+    assert sorted_diffs == [-4, 3, 1, 0, None]
+
+
+def test_stream_sorted_by_metric_refused(tmp_path):
+    print("refuse --stream with --sort-failed-by before making the report dir")
+    report_dir = str(tmp_path / "report")
+    proc = subprocess.run([sys.executable, "report_gen.py", result_file, tpl_dir, report_dir, "Planning BVT", \
+        "planning", "--stream", "--sort-failed-by", "dtw"], cwd=root_dir, stderr=subprocess.PIPE, \
+        universal_newlines=True)
+    assert proc.returncode == 2 and "--sort-failed-by" in proc.stderr
+    assert not os.path.exists(report_dir), "The report dir is made before the options are checked!"
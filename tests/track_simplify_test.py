@@ -0,0 +1,61 @@
+import os
+import sys
+import json
+import numpy as np
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+result_file = os.path.join(root_dir, "result.json")
+
+from pose_pic_gen import Track, TrackParser, RoadPrinter, Keys
+from track_simplify import rdp_mask, segment_distances, simplify_mask
+
+
+def make_track(x, y, codes):
+    count = len(x)
+    return Track(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64), np.zeros(count), \
+        np.zeros(count, dtype=np.float64), np.asarray(codes, dtype=np.int8), ("kForward", "kBackward"))
+
+
+def test_rdp_keeps_shape_within_tolerance():
+    print("simplify a noisy curve within the tolerance")
+    rng = np.random.RandomState(3)
+    t = np.linspace(0, 10, 20000)
+    x = t
+    y = np.sin(t) + rng.uniform(-0.001, 0.001, len(t))
+    keep = rdp_mask(x, y, 0.05)
+    assert keep[0] and keep[-1]
+    assert np.count_nonzero(keep) < 100, "Curve is not simplified!"
+    # Every dropped point is within the tolerance of the segment of the kept points around it
+    kept = np.flatnonzero(keep)
+    for start, end in zip(kept[:-1], kept[1:]):
+        if end - start > 1:
+            assert segment_distances(x, y, start, end).max() <= 0.05
+
+
+def test_direction_switches_are_kept():
+    print("keep the direction switches of a straight track")
+    codes = [0] * 10 + [1] * 10 + [0] * 10
+    track = make_track(np.arange(30.0), np.zeros(30), codes)
+    keep = simplify_mask(track, 0.1)
+    assert list(np.flatnonzero(keep)) == [0, 9, 10, 19, 20, 29]
+    assert list(track.select(keep).direction) == ["kForward", "kForward", "kBackward", "kBackward", \
+        "kForward", "kForward"]
+
+
+def test_legend_reports_dropped_waypoints(tmp_path):
+    print("plot simplified tracks and name the dropped waypoints in the legend")
+    with open(result_file) as res_f:
+        test_cases = json.load(res_f)[Keys.k_test_cases]
+    t_res = [TrackParser(test_case).parse_test_case() for test_case in test_cases if not test_case[Keys.k_case_pass]][0]
+    rp = RoadPrinter(t_res.case_info, t_res.trajectory, str(tmp_path))
+    rp.simplify_tolerance = 0.05
+    actual_track, dropped = rp.simplify(t_res.trajectory.actual_track)
+    assert dropped > 0 and len(actual_track) + dropped == len(t_res.trajectory.actual_track)
+    rp.init_plot()
+    rp.plot_waypoint_line(t_res.trajectory.expect_tracks[0], actual_track, ["Reason"], 0, dropped)
+    labels = [line.get_label() for line in rp.ax.get_lines()]
+    assert labels == ["expect tracks: Reason (0 waypoints dropped)", "actual tracks: Reason (%s waypoints dropped)" % dropped]
+    rp.close_plot()
+    for image_path in rp.plot_pictures():
+        assert os.path.getsize(image_path) > 0
@@ -0,0 +1,33 @@
+import os
+import sys
+import pickle
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from pose_pic_gen import Pose, Track, Keys
+
+
+def make_waypoint(x, y, theta, direction, speed):
+    return {Keys.k_pose: {Keys.k_x: x, Keys.k_y: y, Keys.k_theta: theta}, \
+        Keys.k_direction: direction, Keys.k_speed: speed}
+
+
+def test_track_columns():
+    print("store a road in compact columns")
+    waypoints = [make_waypoint(0, 0.5, 3.1415925, "kForward", 0.5),
+                 make_waypoint(-0.25, 0.75, 3.0, "kBackward", 0.5),
+                 make_waypoint(-0.5, 1.0, 2.75, "kForward", 0.25)]
+    track = Track.from_waypoints(waypoints)
+    assert len(track) == 3
+    assert track.direction_names == ("kForward", "kBackward")
+    assert list(track.direction) == ["kForward", "kBackward", "kForward"]
+    assert track[1] == Pose(-0.25, 0.75, 3.0, "kBackward", 0.5)
+    assert track.nbytes == 3 * (8 * 4 + 1)
+    # Rows give back the parsed values, not float32 roundings of them
+    speed_track = Track.from_waypoints([make_waypoint(0.0, 0.0, 0.0, "kForward", 0.3)])
+    assert speed_track[0].speed == 0.3
+
+    copied = pickle.loads(pickle.dumps(track))
+    assert list(copied) == list(track), "Track is not picklable!"
+    assert len(Track.from_waypoints([])) == 0
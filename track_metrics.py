@@ -0,0 +1,127 @@
+import math
+import numpy as np
+from report_keys import METRIC_NAMES
+
+# Full alignment up to this many cells, longer track pairs are aligned inside a band
+MAX_FULL_CELLS = 4 * 1000 * 1000
+DEFAULT_BAND = 0.1
+
+
+def track_points(track):
+    return np.column_stack((track.x, track.y))
+
+
+def diagonal_bounds(k, n, m, band):
+    """The rows i of the cells (i, k - i) on anti-diagonal k, inside the Sakoe-Chiba band"""
+    low = max(1, k - m)
+    high = min(n, k - 1)
+    if band is not None:
+        # |i / n - j / m| <= band with j = k - i, widened by one cell to keep the band connected
+        scale = float(n * m) / (n + m)
+        low = max(low, int(math.floor((float(k) / m - band) * scale)) - 1)
+        high = min(high, int(math.ceil((float(k) / m + band) * scale)) + 1)
+    return low, high
+
+
+def align(points_a, points_b, frechet, band):
+    """
+    Dynamic programming over the anti-diagonals of the cost matrix: every cell of a diagonal
+    only depends on the two previous diagonals, so a diagonal is computed in one vectorized
+    step and only the last diagonals (indexed by row) are kept in memory
+    """
+    n = len(points_a)
+    m = len(points_b)
+    if n == 0 or m == 0:
+        return float("nan")
+    if band is None and n * m > MAX_FULL_CELLS:
+        band = DEFAULT_BAND
+    prev2 = np.full(n + 1, np.inf)
+    prev1 = np.full(n + 1, np.inf)
+    cur = np.full(n + 1, np.inf)
+    # Cell (0, 0) is the start, it's on diagonal 0
+    prev2[0] = 0.0
+    # The rows written in each buffer, they are reset instead of allocating a buffer per diagonal
+    prev2_rows = (0, 0)
+    prev1_rows = cur_rows = (1, 0)
+    for k in range(2, n + m + 1):
+        cur[cur_rows[0]:cur_rows[1] + 1] = np.inf
+        low, high = diagonal_bounds(k, n, m, band)
+        cur_rows = (low, high)
+        if low <= high:
+            # Rows low..high are a slice of every buffer, their columns j = k - i go backward in points_b
+            diff = points_a[low - 1:high] - points_b[k - high - 1:k - low][::-1]
+            cost = np.hypot(diff[:, 0], diff[:, 1])
+            # (i - 1, j - 1) is on diagonal k - 2, (i - 1, j) and (i, j - 1) on diagonal k - 1
+            best = np.minimum(np.minimum(prev2[low - 1:high], prev1[low - 1:high]), prev1[low:high + 1])
+            if frechet:
+                np.maximum(cost, best, out=cur[low:high + 1])
+            else:
+                np.add(cost, best, out=cur[low:high + 1])
+        prev2, prev1, cur = prev1, cur, prev2
+        prev2_rows, prev1_rows, cur_rows = prev1_rows, cur_rows, prev2_rows
+    return float(prev1[n])
+
+
+def dtw_distance(track_a, track_b, band=None):
+    return align(track_points(track_a), track_points(track_b), False, band)
+
+
+def frechet_distance(track_a, track_b, band=None):
+    return align(track_points(track_a), track_points(track_b), True, band)
+
+
+def endpoint_error(track_a, track_b):
+    if len(track_a) == 0 or len(track_b) == 0:
+        return float("nan")
+    return float(math.hypot(track_a.x[-1] - track_b.x[-1], track_a.y[-1] - track_b.y[-1]))
+
+
+def heading_error(track_a, track_b):
+    if len(track_a) == 0 or len(track_b) == 0:
+        return float("nan")
+    diff = track_a.theta[-1] - track_b.theta[-1]
+    # Wrap to [-pi, pi), -pi and pi are the same heading
+    return float(abs((diff + math.pi) % (2 * math.pi) - math.pi))
+
+
+def turn_count(track):
+    """How many times the track switches between forward and backward"""
+    codes = track.direction_codes
+    return int(np.count_nonzero(codes[1:] != codes[:-1]))
+
+
+def track_metrics(expect_track, actual_track, band=None):
+    metrics = {
+        "dtw": dtw_distance(expect_track, actual_track, band),
+        "frechet": frechet_distance(expect_track, actual_track, band),
+        "endpoint_error": endpoint_error(expect_track, actual_track),
+        "heading_error": heading_error(expect_track, actual_track),
+        "expect_turn_count": turn_count(expect_track),
+        "actual_turn_count": turn_count(actual_track),
+    }
+    metrics["turn_count_diff"] = metrics["actual_turn_count"] - metrics["expect_turn_count"]
+    return metrics
+
+
+def round_metrics(metrics, digits=3):
+    return dict((name, round(value, digits) if isinstance(value, float) else value) \
+        for name, value in metrics.items())
+
+
+def trajectory_metrics(trajectory, band=None):
+    """
+    Metrics of the actual track against every expect track of a Trajectory. The case metrics
+    are the ones of the closest expect track (smallest DTW), with its index as expect_track
+    """
+    track_results = [round_metrics(track_metrics(expect_track, trajectory.actual_track, band)) \
+        for expect_track in trajectory.expect_tracks]
+    if not track_results:
+        return None
+    best_index = 0
+    for i, metrics in enumerate(track_results):
+        if metrics["dtw"] < track_results[best_index]["dtw"]:
+            best_index = i
+    case_metrics = dict(track_results[best_index])
+    case_metrics["expect_track"] = best_index
+    case_metrics["tracks"] = track_results
+    return case_metrics
@@ -0,0 +1,55 @@
+import numpy as np
+
+
+def segment_distances(x, y, start, end):
+    """Distance of the points between start and end to the segment from start to end"""
+    px = x[start + 1:end] - x[start]
+    py = y[start + 1:end] - y[start]
+    dx = x[end] - x[start]
+    dy = y[end] - y[start]
+    length2 = dx * dx + dy * dy
+    if length2 == 0.0:
+        return np.hypot(px, py)
+    t = np.clip((px * dx + py * dy) / length2, 0.0, 1.0)
+    return np.hypot(px - t * dx, py - t * dy)
+
+
+def rdp_mask(x, y, tolerance, keep=None):
+    """
+    Ramer-Douglas-Peucker: the points to keep so that no dropped point is further than
+    tolerance from the polyline of the kept ones. The points already set in keep are
+    kept too and split the track into stretches simplified on their own. Iterative with
+    one vectorized distance computation per split, so long tracks don't recurse deeply
+    """
+    count = len(x)
+    keep = np.zeros(count, dtype=bool) if keep is None else keep.copy()
+    if count == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    anchors = np.flatnonzero(keep)
+    stack = list(zip(anchors[:-1], anchors[1:]))
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        distances = segment_distances(x, y, start, end)
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
+
+
+def turning_points(direction_codes):
+    """The waypoints on both sides of every switch between forward and backward"""
+    keep = np.zeros(len(direction_codes), dtype=bool)
+    switches = np.flatnonzero(direction_codes[1:] != direction_codes[:-1])
+    keep[switches] = True
+    keep[switches + 1] = True
+    return keep
+
+
+def simplify_mask(track, tolerance):
+    return rdp_mask(track.x, track.y, tolerance, turning_points(track.direction_codes))